@@ -7,129 +7,151 @@ https://github.com/AlexandreSajus/PythonEcosystem
 agents.py takes care of managing the behaviour of the animals
 """
 
-import functools
-from copy import deepcopy
-from math import sqrt, inf
-from random import randint, random
+import random
+from math import inf
 
+from scheduler import Clock
+from topology import MOVES, bounded, distance
 
-@functools.lru_cache(maxsize=128, typed=False)
-def distance(x1, y1, x2, y2):
-    """
-    Measures the distance between two agents
-    :param agent1, agent2: an animal, bunny or fox
-    :type agent1, agent2: Object
-    :return: distance
-    :rtype: Float
-    """
-    x_dist = x1 - x2
-    y_dist = y1 - y2
-    return sqrt((x_dist*x_dist) + (y_dist*y_dist))
 
-
-def unit_vector(agent1, agent2):
+def unit_vector(agent1, agent2, topology=None):
     """
     Returns the unit vector from agent1 to agent2
     :param agent1, agent2: an animal, bunny or fox
     :type agent1, agent2: Object
+    :param topology: topology of the world, a bounded one if None
+    :type topology: Topology
     :return: unit vector (x, y)
     :rtype: Tuple
     """
-    d = max(distance(agent1.x, agent1.y, agent2.x, agent2.y), 0.1)
-    return (agent2.x - agent1.x)/d, (agent2.y - agent1.y)/d
+    if topology is None:
+        d = max(distance(agent1.x, agent1.y, agent2.x, agent2.y), 0.1)
+        return (agent2.x - agent1.x)/d, (agent2.y - agent1.y)/d
+    return topology.unit_vector(agent1.x, agent1.y, agent2.x, agent2.y)
 
 
-def legal_move(move, state):
-    """
-    Checks if the move is possible and is not out of bounds
-    :param move: next potential position for an agent (x, y)
-    :type move: Tuple
-    :param state: state, 2D array of size h*w with 0 if the spot is empty or the id of an agent if an agent is in the spot
-    :type state: Array
-    :return: True if the move is legal, False elsewise
-    :rtype: Bool
-    """
-    yMax = len(state)
-    xMax = len(state[0])
-    return 0 <= move[0] < xMax and 0 <= move[1] < yMax
-
-
-def move_towards(agent, agentT, state, direction):
+def move_towards(agent, agentT, state, direction, rng=random, topology=None):
     """
     Move agent towards agentT. If the move is illegal, move randomly
     :param agent, agentT: an animal, fox or bunny
     :type agent, agentT: Object
-    :param state: state, 2D array of size h*w with 0 if the spot is empty or the id of an agent if an agent is in the spot
+    :param state: state, integer array of size h*w*2 with the number of bunnies (state[y, x, 0]) and foxes (state[y, x, 1]) on each spot
     :type state: Array
     :param direction: 1 if agent wants to move towards agentT, -1 if agent wants to run away from agentT
     :type direction: int
+    :param rng: random generator of the world, the random module by default
+    :type rng: BatchedRandom or random.Random
+    :param topology: topology of the world, the bounded one of the shape of state if None
+    :type topology: Topology
     """
-    xU, yU = unit_vector(agent, agentT)
+    if topology is None:
+        topology = bounded(*state.shape[:2])
+    x = agent.x
+    y = agent.y
+    xU, yU = topology.unit_vector(x, y, agentT.x, agentT.y)
+    # index in MOVES of the move along the largest component, away from agentT if direction is -1
     if abs(xU) >= abs(yU):
-        if xU > 0:
-            xU = 1*direction
-        else:
-            xU = -1*direction
-        move = (agent.x + xU, agent.y)
-        if legal_move(move, state):
-            (agent.x, agent.y) = move
-        else:
-            random_movement(agent, state)
+        i = 0 if (xU > 0) == (direction > 0) else 1
+    else:
+        i = 2 if (yU > 0) == (direction > 0) else 3
+    if (topology.blockedX[x] | topology.blockedY[y]) >> i & 1:
+        random_movement(agent, state, rng, topology)
     else:
-        if yU > 0:
-            yU = 1*direction
-        else:
-            yU = -1*direction
-        move = (agent.x, agent.y + yU)
-        if legal_move(move, state):
-            (agent.x, agent.y) = move
-        else:
-            random_movement(agent, state)
-
-
-def random_movement(agent, state, moves=None):
+        dx, dy = MOVES[i]
+        agent.x = topology.xs[x + dx]
+        agent.y = topology.ys[y + dy]
+
+
+def random_movement(agent, state, rng=random, topology=None):
     """
-    Move randomly where it is legal to move
+    Move randomly where it is legal to move, every legal move being equally likely
     :param agent: an animal, fox or bunny
     :type agent: Object
-    :param state: state, 2D array of size h*w with 0 if the spot is empty or the id of an agent if an agent is in the spot
+    :param state: state, integer array of size h*w*2 with the number of bunnies (state[y, x, 0]) and foxes (state[y, x, 1]) on each spot
     :type state: Array
+    :param rng: random generator of the world, the random module by default
+    :type rng: BatchedRandom or random.Random
+    :param topology: topology of the world, the bounded one of the shape of state if None
+    :type topology: Topology
     """
+    if topology is None:
+        topology = bounded(*state.shape[:2])
     x = agent.x
     y = agent.y
-    moves = moves or [(x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)]
-    move = moves.pop(randint(0, len(moves)-1))
-    if legal_move(move, state):
-        (agent.x, agent.y) = move
-    else:
-        random_movement(agent, state, moves)
+    moves = topology.moves(x, y)
+    dx, dy = moves[int(rng.random() * len(moves))]
+    agent.x = topology.xs[x + dx]
+    agent.y = topology.ys[y + dy]
 
 
 def detect_prey(agent, liveAgents, is_prey):
     """
     Detects if agent can see an instance of type animal in his visibility range
+    Only the buckets of the spatial index of liveAgents inside the visibility range are scanned
+    The result is kept by the agent as its target for that species and reused without scanning while it is provably
+    still the nearest: every agent moves at most one cell per step, so after k steps no other agent can be closer than
+    the second nearest distance found by the scan minus k minus the distance the agent moved itself.
+    liveAgents.targetRefresh also keeps live targets in range for a number of steps without that proof, trading accuracy
+    for fewer scans
+    Newborns appear on their parents, so the proof covers the newborns of scanned agents but not the ones of agent
+    itself: agents forget their target of their own species when they reproduce (see Bunny.find_partner and Fox.behave)
     :param agent: an animal, fox or bunny
     :type agent: Object
-    :param: liveAgents, a dictionary with key=id_of_agent and value=agent
-    :type liveAgents: Dict
-    :param: animal: fox or bunny class
-    :type: animal: Class
+    :param: liveAgents, the live agents indexed by position
+    :type liveAgents: AgentRegistry
+    :param: is_prey: IS_PREY of the animal to look for
+    :type: is_prey: Bool
     """
+    # distances along the shortest way, across the borders of a toroidal world
+    measure = distance if liveAgents.topology is None else liveAgents.topology.distance
+    target = agent.target[is_prey]
+    if target is not None:
+        prey, key, since, x, y, bound = target
+        elapsed = liveAgents.clock.now - since
+        # no agent of the species can be closer than margin, so the cached prey is still the nearest if it is closer
+        margin = bound - liveAgents.reach(is_prey, elapsed) - measure(x, y, agent.x, agent.y)
+        if prey is None:
+            if agent.visibility < margin:
+                liveAgents.counters.targetHits += 1
+                return None, None
+        elif prey.diedAt is None and prey.id == key:  # a recycled agent (see pool.py) is a new agent
+            dist = measure(agent.x, agent.y, prey.x, prey.y)
+            if dist <= agent.visibility and (dist < margin or elapsed < liveAgents.targetRefresh):
+                liveAgents.counters.targetHits += 1
+                return prey, key
+    liveAgents.counters.targetScans += 1
     minPrey = None
     minDist = inf
     minKey = None
-    for key, prey in liveAgents.items():
-        if prey.IS_PREY == is_prey and prey != agent and prey.x - agent.x <= agent.visibility and prey.y - agent.y <= agent.visibility:
-            dist = distance(agent.x, agent.y, prey.x, prey.y)
-            if minDist > dist <= agent.visibility:
+    radius = agent.visibility + liveAgents.targetSlack
+    secondDist = radius  # the agents that are not scanned are further than radius
+    for key, prey in liveAgents.nearby(agent.x, agent.y, radius, is_prey):
+        if prey is not agent:
+            dist = measure(agent.x, agent.y, prey.x, prey.y)
+            # on ties keep the oldest key, as a full scan of liveAgents in insertion order would
+            if dist <= agent.visibility and (dist < minDist or (dist == minDist and key < minKey)):
+                if minDist < secondDist:
+                    secondDist = minDist
                 minPrey = prey
                 minDist = dist
                 minKey = key
+            elif dist < secondDist:
+                secondDist = dist
+    agent.target[is_prey] = (minPrey, minKey, liveAgents.clock.now, agent.x, agent.y, secondDist)
     return minPrey, minKey
 
 
+# clock of the agents outside of any registry
+UNREGISTERED = Clock()
+
+
 class Animal:
+    # no per-instance __dict__, the attributes are stored in fixed slots
+    __slots__ = ("x", "y", "speed", "visibility", "gestChance", "gestStatus", "gestNumber", "diesAt", "clock", "target",
+                 "id", "diedAt")
+
     def __init__(self, x, y, speed, visibility, gestChance, gestStatus, gestNumber, age):
+        self.clock = UNREGISTERED  # replaced by the clock of the registry (see register)
         self.x = x
         self.y = y
         self.speed = speed
@@ -138,57 +160,81 @@ class Animal:
         self.gestStatus = gestStatus
         self.gestNumber = gestNumber
         self.age = age
+        self.target = [None, None]  # last result of detect_prey per species searched, indexed by IS_PREY
+        self.id = None  # given by the AgentRegistry
+        self.diedAt = None
+
+    @property
+    def age(self):
+        """
+        Steps left before the agent dies of old age, it dies on the step where age reaches 0
+        """
+        return self.diesAt - self.clock.now
+
+    @age.setter
+    def age(self, age):
+        self.diesAt = self.clock.now + age
+        self.clock.schedule(self.diesAt, self)
+
+    def register(self, clock):
+        """
+        Moves the agent to the clock of a registry, keeping its age
+        """
+        age = self.age
+        self.clock = clock
+        self.age = age
+
+    def dies_on(self, now):
+        return self.diesAt == now
 
 
 class Bunny(Animal):
     """
     Bunny class, its variables are explained in run.py
     """
+    __slots__ = ()
     IS_PREY = True
 
+    def clone(self, age, pool=None):
+        """
+        Returns a newborn copy of the agent with the given age, re-initializing a dead agent of pool if there is one
+        """
+        child = Bunny.__new__(Bunny) if pool is None else pool.take(Bunny)
+        child.__init__(self.x, self.y, self.speed, self.visibility, self.gestChance, self.gestStatus, self.gestNumber, age)
+        return child
+
     def age_creature(self, liveAgents):
-        self.age -= 1  # decrease the age (if age reaches 0, the agent dies)
-        if self.age == 0:  # kill the agent if age reaches O
-            for key, agent in liveAgents.items():
-                if agent == self:
-                    liveAgents.pop(key, None)
-                    break
+        # the age decreases with the clock of liveAgents, kill the agent if age reaches O
+        if self.dies_on(self.clock.now):
+            liveAgents.remove(self)
 
     def handle_fox_in_area(self, state, liveAgents):
         # check for foxes in the area
         minFox, minFKey = detect_prey(self, liveAgents, Fox.IS_PREY)
         if minFox is not None:  # if there is a fox, run away
-            move_towards(self, minFox, state, -1)
+            move_towards(self, minFox, state, -1, liveAgents.rng, liveAgents.topology)
             return True
 
-    def doesnt_want_to_reproduce(self, state):
+    def doesnt_want_to_reproduce(self, state, rng=random, topology=None):
         if self.gestStatus == 0:  # if there is no fox and the agent doesn't want to reproduce, move randomly
             # random chance to want to reproduce next turn
-            self.gestStatus = int(random() < self.gestChance)
-            random_movement(self, state)
+            self.gestStatus = int(rng.random() < self.gestChance)
+            random_movement(self, state, rng, topology)
             return True
 
     def find_partner(self, state, liveAgents, age_bunny):
         # if the agent wants to reproduce, find another bunny
         minPrey, minKey = detect_prey(self, liveAgents, Bunny.IS_PREY)
         if minPrey is not None:
-            move_towards(self, minPrey, state, 1)
+            move_towards(self, minPrey, state, 1, liveAgents.rng, liveAgents.topology)
             if self.x == minPrey.x and self.y == minPrey.y:  # if a bunny has been found, reproduce
                 self.gestStatus = 0
-                maxKey = max(liveAgents)  # find an unassigned key in liveAgents for the newborns
+                # the newborns stand on both parents, which their own scans of bunnies never bound (see detect_prey)
+                self.target[Bunny.IS_PREY] = minPrey.target[Bunny.IS_PREY] = None
 
                 for i in range(self.gestNumber):
-                    # the newborns are a copy of the parent
-                    liveAgents[maxKey + i + 1] = Bunny(
-                        self.x,
-                        self.y,
-                        self.speed,
-                        self.visibility,
-                        self.gestChance,
-                        self.gestStatus,
-                        self.gestNumber,
-                        age_bunny  # reset the age of the newborns
-                    )
+                    # the newborns are a copy of the parent with a reset age
+                    liveAgents.add(self.clone(age_bunny, liveAgents.pool))
             return True
 
     def act(self, t, state, liveAgents, age_bunny):
@@ -199,71 +245,116 @@ class Bunny(Animal):
 
         # the agent can only act on some values of t (time), the frequency of these values are defined by speed
         if t % self.speed == 0:
-            if (
-                    not self.handle_fox_in_area(state, liveAgents)
-                    and not self.doesnt_want_to_reproduce(state)
-                    and not self.find_partner(state, liveAgents, age_bunny)
-            ):
-                random_movement(self, state)
+            self.behave(state, liveAgents, age_bunny)
+
+    def behave(self, state, liveAgents, age_bunny):
+        """
+        behave is what the agent does on the steps where its speed lets it act
+        """
+        if (
+                not self.handle_fox_in_area(state, liveAgents)
+                and not self.doesnt_want_to_reproduce(state, liveAgents.rng, liveAgents.topology)
+                and not self.find_partner(state, liveAgents, age_bunny)
+        ):
+            random_movement(self, state, liveAgents.rng, liveAgents.topology)
+        liveAgents.relocate(self)
 
 
 class Fox(Animal):
     """
     Fox class, its variables are explained in run.py
     """
+    __slots__ = ("huntStatus", "starvesAt", "hungerThresMin", "hungerThresMax", "hungerReward", "maxHunger")
     IS_PREY = False
 
     def __init__(self, x, y, speed, visibility, age, huntStatus, hunger, hungerThresMin, hungerThresMax, hungerReward, maxHunger,
                  gestChance, gestStatus, gestNumber):
         super(Fox, self).__init__(x, y, speed, visibility, gestChance, gestStatus, gestNumber, age)
         self.huntStatus = huntStatus
+        self.maxHunger = maxHunger
         self.hunger = hunger
         self.hungerThresMin = hungerThresMin
         self.hungerThresMax = hungerThresMax
         self.hungerReward = hungerReward
-        self.maxHunger = maxHunger
+
+    def clone(self, age, pool=None):
+        """
+        Returns a newborn copy of the agent with the given age, re-initializing a dead agent of pool if there is one
+        """
+        child = Fox.__new__(Fox) if pool is None else pool.take(Fox)
+        child.__init__(self.x, self.y, self.speed, self.visibility, age, self.huntStatus, self.hunger, self.hungerThresMin,
+                       self.hungerThresMax, self.hungerReward, self.maxHunger, self.gestChance, self.gestStatus,
+                       self.gestNumber)
+        return child
+
+    @property
+    def hunger(self):
+        """
+        Steps left before the agent starves, it dies on the step where hunger reaches 0
+        """
+        return self.starvesAt - self.clock.now
+
+    @hunger.setter
+    def hunger(self, hunger):
+        # hunger decreases with the clock and can't go over maxHunger: it is brought back to maxHunger on the next step,
+        # so the agent starves maxHunger + 1 steps from now at the latest
+        self.starvesAt = self.clock.now + min(hunger, self.maxHunger + 1)
+        self.clock.schedule(self.starvesAt, self)
+
+    def register(self, clock):
+        """
+        Moves the agent to the clock of a registry, keeping its age and hunger
+        """
+        hunger = self.hunger
+        super(Fox, self).register(clock)
+        self.hunger = hunger
+
+    def dies_on(self, now):
+        return self.diesAt == now or self.starvesAt == now
 
     def act(self, t, state, liveAgents, age_fox):
         """
          act controls the behavior of the agent at every step of the simulation
         """
-        self.age -= 1  # decrease age (if age reaches O, the agent dies)
-        # decrease hunger (if hunger reaches O, the agent dies)
-        self.hunger -= 1
-        # hunger can't go over maxHunger
-        self.hunger = min(self.maxHunger, self.hunger)
-        if self.age == 0 or self.hunger == 0:  # kill the agent in case of starvation or aging
-            for key, agent in liveAgents.items():
-                if agent == self:
-                    liveAgents.pop(key, None)
-                    break
+        # age and hunger decrease with the clock of liveAgents
+        if self.dies_on(self.clock.now):  # kill the agent in case of starvation or aging
+            liveAgents.remove(self)
         # the agent can only act on some values of t (time), the frequency of these values are defined by speed
         if t % self.speed == 0:
-            if self.huntStatus == 0:  # if not hunting
-                if self.hunger <= self.hungerThresMin:  # if hunger goes under thresholdMin, go hunting
-                    self.huntStatus = 1
-                if self.gestStatus == 1:  # if the agent wants to reproduce, find another fox
-                    minPrey, minKey = detect_prey(self, liveAgents, Fox.IS_PREY)
-                    if minPrey is not None:
-                        move_towards(self, minPrey, state, 1)
-                        if self.x == minPrey.x and self.y == minPrey.y:  # if another fox is found, reproduce
-                            self.gestStatus = 0
-                            maxKey = max(liveAgents)  # find an unassigned key for the newborns
-
-                            for i in range(self.gestNumber):
-                                # the newborns are copies of the parent
-                                liveAgents[maxKey + i + 1] = deepcopy(self)
-                                # reset the age of the newborns
-                                liveAgents[maxKey + i + 1].age = age_fox
-                elif self.gestChance > random():  # random chance to want to reproduce
-                        self.gestStatus = 1
-            else:  # if the agent wants to hunt
-                if self.hunger >= self.hungerThresMax:  # if hunger goes over thresholdMax, stop hunting
-                    self.huntStatus = 0
-                minPrey, minKey = detect_prey(
-                    self, liveAgents, Bunny.IS_PREY)  # find a prey
+            self.behave(state, liveAgents, age_fox)
+
+    def behave(self, state, liveAgents, age_fox):
+        """
+        behave is what the agent does on the steps where its speed lets it act
+        """
+        if self.huntStatus == 0:  # if not hunting
+            if self.hunger <= self.hungerThresMin:  # if hunger goes under thresholdMin, go hunting
+                self.huntStatus = 1
+            if self.gestStatus == 1:  # if the agent wants to reproduce, find another fox
+                minPrey, minKey = detect_prey(self, liveAgents, Fox.IS_PREY)
                 if minPrey is not None:
-                    move_towards(self, minPrey, state, 1)
-                    if self.x == minPrey.x and self.y == minPrey.y:  # if the agent is on the prey, kill the prey
-                        liveAgents.pop(minKey, None)
-                        self.hunger += self.hungerReward
+                    move_towards(self, minPrey, state, 1, liveAgents.rng, liveAgents.topology)
+                    if self.x == minPrey.x and self.y == minPrey.y:  # if another fox is found, reproduce
+                        self.gestStatus = 0
+                        # the newborns stand on both parents, which their own scans of foxes never bound (see
+                        # detect_prey)
+                        self.target[Fox.IS_PREY] = minPrey.target[Fox.IS_PREY] = None
+
+                        for i in range(self.gestNumber):
+                            # the newborns are copies of the parent with a reset age
+                            liveAgents.add(self.clone(age_fox, liveAgents.pool))
+            elif self.gestChance > liveAgents.rng.random():  # random chance to want to reproduce
+                    self.gestStatus = 1
+        else:  # if the agent wants to hunt
+            if self.hunger >= self.hungerThresMax:  # if hunger goes over thresholdMax, stop hunting
+                self.huntStatus = 0
+            minPrey, minKey = detect_prey(
+                self, liveAgents, Bunny.IS_PREY)  # find a prey
+            if minPrey is not None:
+                move_towards(self, minPrey, state, 1, liveAgents.rng, liveAgents.topology)
+                if self.x == minPrey.x and self.y == minPrey.y:  # if the agent is on the prey, kill the prey
+                    liveAgents.remove(minPrey)
+                    starvesAt = self.starvesAt
+                    self.hunger += self.hungerReward
+                    liveAgents.counters.fed(self, starvesAt)
+        liveAgents.relocate(self)
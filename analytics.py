@@ -0,0 +1,223 @@
+"""
+Python-Ecosystem by Alexandre Sajus
+
+More information at:
+https://github.com/AlexandreSajus/PythonEcosystem
+
+analytics.py takes care of the distributions of the traits of the live agents, for natural selection studies: speed
+of the bunnies, hunger of the foxes and age (steps left to live) of both species
+With the object engine they are read from the histograms the counters keep up to date on every birth, death and meal
+(see counters.py), so a sample costs the same whatever the number of agents (the vectorized and sharded engines count
+their herds with NumPy instead). Samples are written every k ticks as JSON
+lines and merged in running distributions (mean, variance and fixed-bin histograms for the quantiles), so a run of
+millions of ticks can be analysed without keeping any per-agent history
+
+    with TraitSampler(params, every=100, out="traits.jsonl") as sampler:
+        ecosystem.simulate(100000, params, traits=sampler)
+    print(sampler.summary())
+"""
+
+import json
+
+import numpy as np
+
+import sharded
+import vectorized
+
+TRAITS = ("speedBunny", "hungerFox", "ageBunny", "ageFox")
+QUANTILES = (0.1, 0.5, 0.9)
+
+
+def trait_values(liveAgents):
+    """
+    Distinct values of every trait among the live agents and the number of agents having them
+    Ages that already reached 0 are left out: an agent created with age 0 never dies of age (see agents.Animal.age)
+    :param liveAgents: AgentRegistry of the object engine, VectorWorld of the vectorized engine or ShardedWorld
+    :return: dictionary with key=trait and value=(values, counts)
+    :rtype: Dict
+    """
+    if isinstance(liveAgents, sharded.ShardedWorld):
+        liveAgents = liveAgents.gather()
+    if isinstance(liveAgents, vectorized.VectorWorld):
+        b, f = liveAgents.bunnies, liveAgents.foxes
+        values = {"speedBunny": b.speed, "hungerFox": f.hunger, "ageBunny": b.age[b.age > 0], "ageFox": f.age[f.age > 0]}
+        return {trait: (v, np.ones(len(v), dtype=np.int64)) for trait, v in values.items()}
+    counters, now = liveAgents.counters, liveAgents.clock.now
+
+    def steps_left(expiries):
+        steps = np.fromiter(expiries.keys(), dtype=np.int64, count=len(expiries)) - now
+        counts = np.fromiter(expiries.values(), dtype=np.int64, count=len(expiries))
+        return steps[steps > 0], counts[steps > 0]
+    return {
+        "speedBunny": (np.arange(len(counters.speedCounts)), np.array(counters.speedCounts, dtype=np.int64)),
+        "hungerFox": steps_left(counters.starvesAt),
+        "ageBunny": steps_left(counters.diesAt[True]),
+        "ageFox": steps_left(counters.diesAt[False]),
+    }
+
+
+def trait_edges(params, bins=32):
+    """
+    Edges of the histograms of every trait: one bin per speed, bins bins for the hungers and the ages
+    :param params: parameters of the world (see run.parameters)
+    :type params: Dict
+    :return: dictionary with key=trait and value=edges
+    :rtype: Dict
+    """
+    oldest = max(params["age_bunny"], params["age_fox"]) + 1
+    return {
+        "speedBunny": np.arange(params["speed_bunny_min"], params["speed_bunny_max"] + 2),
+        "hungerFox": np.linspace(0, params["maxHunger_fox"] + 1, bins + 1),
+        "ageBunny": np.linspace(0, oldest, bins + 1),
+        "ageFox": np.linspace(0, oldest, bins + 1),
+    }
+
+
+def weighted_quantiles(values, counts, quantiles=QUANTILES):
+    """
+    :return: exact quantiles of the values repeated counts times, None if there are none
+    :rtype: List
+    """
+    n = counts.sum()
+    if not n:
+        return None
+    order = np.argsort(values)
+    cumulative = np.cumsum(counts[order])
+    return [float(values[order][np.searchsorted(cumulative, q * n, side="left").clip(0, len(values) - 1)])
+            for q in quantiles]
+
+
+class Distribution:
+    """
+    Running distribution of a trait: moments merged batch by batch (Chan et al.) and a fixed-bin histogram from which
+    quantiles are interpolated. Memory and cost per batch do not depend on the number of batches
+    """
+
+    def __init__(self, edges):
+        self.edges = np.asarray(edges, dtype=float)
+        self.counts = np.zeros(len(self.edges) - 1, dtype=np.int64)
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # sum of the squared deviations to the mean
+
+    def add(self, values, counts):
+        """
+        Adds the values, value i being seen counts[i] times
+        """
+        n = int(counts.sum())
+        if not n:
+            return
+        mean = float((values * counts).sum()) / n
+        m2 = float((counts * (values - mean) ** 2).sum())
+        total = self.n + n
+        delta = mean - self.mean
+        self.m2 += m2 + delta * delta * self.n * n / total
+        self.mean += delta * n / total
+        self.n = total
+        # values out of the edges fall in the first or last bin
+        clipped = np.clip(values, self.edges[0], np.nextafter(self.edges[-1], -np.inf))
+        self.counts += np.histogram(clipped, self.edges, weights=counts)[0].astype(np.int64)
+
+    def variance(self):
+        return self.m2 / self.n if self.n else 0.0
+
+    def quantile(self, q):
+        """
+        :return: quantile q of the values added so far, interpolated inside its bin, None if nothing was added
+        :rtype: Float
+        """
+        if not self.n:
+            return None
+        cumulative = np.cumsum(self.counts)
+        i = int(np.searchsorted(cumulative, q * self.n, side="left").clip(0, len(self.counts) - 1))
+        before = cumulative[i] - self.counts[i]
+        share = (q * self.n - before) / self.counts[i] if self.counts[i] else 0.0
+        return float(self.edges[i] + share * (self.edges[i + 1] - self.edges[i]))
+
+    def as_dict(self):
+        return {"n": self.n, "mean": self.mean, "var": self.variance(),
+                "quantiles": [self.quantile(q) for q in QUANTILES], "hist": self.counts.tolist()}
+
+
+class TraitSampler:
+    """
+    Samples the distributions of TRAITS every every ticks, writes them to out and merges them in running distributions
+    The first line of out holds the edges of the histograms, every next line one sample (see read)
+    """
+
+    def __init__(self, params, every=100, out=None, bins=32):
+        """
+        :param params: parameters of the world (see run.parameters)
+        :type params: Dict
+        :param every: ticks between two samples
+        :type every: Int
+        :param out: path of the JSON lines file receiving the samples, None to keep them in memory only
+        :type out: String
+        :param bins: number of bins of the histograms of the hungers and the ages
+        :type bins: Int
+        """
+        self.every = every
+        self.edges = trait_edges(params, bins)
+        self.running = {trait: Distribution(edges) for trait, edges in self.edges.items()}
+        self.samples = 0
+        self.last = None  # last sample
+        self.file = None
+        if out is not None:
+            self.file = open(out, "w")
+            self.file.write(json.dumps({"edges": {trait: edges.tolist() for trait, edges in self.edges.items()}}) + "\n")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def tick(self, t, liveAgents):
+        """
+        Samples liveAgents if t is a multiple of every
+        :param t: number of steps done so far
+        :type t: Int
+        """
+        if t % self.every == 0:
+            self.sample(t, liveAgents)
+
+    def sample(self, t, liveAgents):
+        """
+        :return: distribution of every trait at time t: number of agents, mean, variance, exact quantiles and histogram
+        :rtype: Dict
+        """
+        sample = {"t": t}
+        for trait, (values, counts) in trait_values(liveAgents).items():
+            current = Distribution(self.edges[trait])
+            current.add(values, counts)
+            self.running[trait].add(values, counts)
+            sample[trait] = dict(current.as_dict(), quantiles=weighted_quantiles(values, counts))
+        self.samples += 1
+        self.last = sample
+        if self.file is not None:
+            self.file.write(json.dumps(sample) + "\n")
+            self.file.flush()
+        return sample
+
+    def summary(self):
+        """
+        :return: distribution of every trait over every sample taken, each agent counting once per sample
+        :rtype: Dict
+        """
+        return {trait: distribution.as_dict() for trait, distribution in self.running.items()}
+
+
+def read(path):
+    """
+    Reads a file written by a TraitSampler
+    :return: edges of the histograms of every trait, samples
+    :rtype: Dict, List
+    """
+    with open(path) as file:
+        edges = {trait: np.array(values) for trait, values in json.loads(file.readline())["edges"].items()}
+        return edges, [json.loads(line) for line in file]
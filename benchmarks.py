@@ -0,0 +1,285 @@
+"""
+Python-Ecosystem by Alexandre Sajus
+
+More information at:
+https://github.com/AlexandreSajus/PythonEcosystem
+
+benchmarks.py measures the cost of the simulation on seeded worlds
+    python benchmarks.py functions              time per call of the functions of the step loop
+    python benchmarks.py scaling                steps per second for several populations and grid sizes
+    python benchmarks.py profile                cProfile report of a seeded run, compared to benchmarks_baseline.json
+    python benchmarks.py profile --save-baseline
+    python benchmarks.py memory                 bytes per agent and births per second, with and without AgentPool,
+                                                compared to agents without __slots__
+"""
+
+import argparse
+import copy
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import time
+import tracemalloc
+
+import agents
+import run
+from agents import Bunny, Fox
+from pool import AgentPool
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks_baseline.json")
+
+
+def new_bunny():
+    return Bunny(0, 0, 2, 10, 0.0008, 0, 3, 5000)
+
+
+def new_fox():
+    return Fox(0, 0, 4, 100, 800, 0, 250, 350, 450, 150, 500, 0.0004, 0, 1)
+
+
+class Unslotted:
+    """
+    Reference agent keeping its attributes in a per-instance __dict__, the layout of the agents before they declared
+    __slots__ (see memory)
+    """
+
+
+def unslotted(make):
+    """
+    :param make: function returning a new agent
+    :type make: Function
+    :return: function returning an Unslotted holding the attributes of a new agent of make
+    :rtype: Function
+    """
+    def make_unslotted():
+        agent = make()
+        reference = Unslotted()
+        for cls in type(agent).__mro__:
+            for name in getattr(cls, "__slots__", ()):
+                setattr(reference, name, getattr(agent, name))
+        return reference
+    return make_unslotted
+
+
+def bytes_per_agent(make, n=100_000):
+    """
+    Measures the memory allocated per agent
+    :param make: function returning a new agent
+    :type make: Function
+    :return: bytes per agent
+    :rtype: Float
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    agents = [make() for _ in range(n)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # the list holding the agents costs one pointer per agent
+    return (after - before) / len(agents) - 8
+
+
+def births_per_second(parent, birth, n=100_000):
+    """
+    Measures how many newborns birth can create per second
+    :param birth: function taking the parent and returning a newborn
+    :type birth: Function
+    :return: births per second
+    :rtype: Float
+    """
+    start = time.perf_counter()
+    for _ in range(n):
+        birth(parent)
+    return n / (time.perf_counter() - start)
+
+
+def memory():
+    print("%-12s %16s %22s %22s %24s" % ("", "bytes per agent", "births/s with clone", "births/s with pool",
+                                         "births/s with deepcopy"))
+    for name, make in (("bunny", new_bunny), ("fox", new_fox)):
+        parent = make()
+        pool = AgentPool()
+        print("%-12s %16.0f %22.0f %22.0f %24.0f" % (
+            name, bytes_per_agent(make), births_per_second(parent, lambda agent: agent.clone(800)),
+            # every newborn dies at once and is reused by the next birth
+            births_per_second(parent, lambda agent: pool.release([agent.clone(800, pool)])),
+            births_per_second(parent, copy.deepcopy)))
+        # the same agent without __slots__, born by deepcopy as before clone
+        make = unslotted(make)
+        print("%-12s %16.0f %22s %22s %24.0f" % (
+            name + " (dict)", bytes_per_agent(make), "-", "-", births_per_second(make(), copy.deepcopy)))
+
+
+def seeded_world(n_bunnies=100, size=50, seed=0, engine="object", **overrides):
+    """
+    Creates a world with the parameters of run.py, n_bunnies bunnies and 6 foxes per 100 bunnies
+    :param overrides: other parameters replacing the ones of run.py
+    :return: state, liveAgents
+    :rtype: Array, AgentRegistry
+    """
+    params = run.parameters(w=size, h=size, n_bunnies=n_bunnies, n_foxes=max(1, n_bunnies * 6 // 100), **overrides)
+    return run.new_world(params, engine, seed)
+
+
+def time_per_call(function, repeat):
+    """
+    :return: seconds per call of function()
+    :rtype: Float
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat
+
+
+def functions(n_bunnies=1000, size=200, repeat=200, seed=0):
+    print("world of %d bunnies on a %dx%d grid, seed %d" % (n_bunnies, size, size, seed))
+    state, liveAgents = seeded_world(n_bunnies, size, seed)
+    bunny = next(agent for agent in liveAgents.values() if agent.IS_PREY)
+    fox = next(agent for agent in liveAgents.values() if not agent.IS_PREY)
+    clock = iter(range(10 ** 9))
+    timings = [
+        ("detect_prey (bunny)", lambda: agents.detect_prey(bunny, liveAgents, Bunny.IS_PREY)),
+        ("detect_prey (fox)", lambda: agents.detect_prey(fox, liveAgents, Bunny.IS_PREY)),
+        ("Bunny.act", lambda: Bunny.act(bunny, 0, state, liveAgents, run.age_fox)),
+        ("Fox.act", lambda: Fox.act(fox, 0, state, liveAgents, run.age_fox)),
+        ("update_state", lambda: run.update_state(state, liveAgents)),
+        ("count", lambda: run.count(liveAgents)),
+        ("export", lambda: run.export(liveAgents)),
+        ("step", lambda: run.step(next(clock), state, liveAgents)),
+    ]
+    for name, function in timings:
+        print("%-20s %12.2f us/call" % (name, time_per_call(function, repeat) * 1e6))
+
+
+def scaling(populations=(100, 1000, 5000), sizes=(50, 200, 1000), steps=100, seed=0, engine="object", targetRefresh=0):
+    print("%10s %8s %12s %20s %12s" % ("bunnies", "grid", "steps/s", "us per agent-tick", "target hits"))
+    for n_bunnies in populations:
+        for size in sizes:
+            state, liveAgents = seeded_world(n_bunnies, size, seed, engine, targetRefresh=targetRefresh)
+            agentTicks = 0
+            start = time.perf_counter()
+            for t in range(steps):
+                state = run.step(t, state, liveAgents)
+                liveBunnies, liveFoxes, _ = run.count(liveAgents)
+                agentTicks += liveBunnies + liveFoxes
+            elapsed = time.perf_counter() - start
+            # share of the searches of detect_prey answered by a cached target (object engine only)
+            hits = "%.1f%%" % (100 * liveAgents.counters.target_hit_rate()) if hasattr(liveAgents, "counters") else "-"
+            print("%10d %8d %12.1f %20.3f %12s" % (n_bunnies, size, steps / elapsed, elapsed / max(agentTicks, 1) * 1e6,
+                                                   hits))
+
+
+def profile_run(steps=2000, seed=0):
+    """
+    Profiles the default world of run.py for a number of steps
+    :return: profiler holding the statistics
+    :rtype: cProfile.Profile
+    """
+    state, liveAgents = seeded_world(run.n_bunnies, run.w, seed)
+    profiler = cProfile.Profile()
+    profiler.enable()
+    for t in range(steps):
+        state = run.step(t, state, liveAgents)
+        run.count(liveAgents)
+    profiler.disable()
+    return profiler
+
+
+def summarize_profile(stats):
+    """
+    :return: total time and, for every function of the repository, its calls and internal time
+    :rtype: Dict
+    """
+    root = os.path.dirname(os.path.abspath(__file__))
+    summary = {"total": stats.total_tt, "functions": {}}
+    for (path, line, name), (_, calls, tottime, _, _) in stats.stats.items():
+        if path.startswith(root):
+            # methods sharing a name in one file (Bunny.act and Fox.act) are added up
+            function = summary["functions"].setdefault("%s(%s)" % (os.path.relpath(path, root), name),
+                                                       {"calls": 0, "tottime": 0.0})
+            function["calls"] += calls
+            function["tottime"] += tottime
+    return summary
+
+
+def compare_profiles(current, baseline, tolerance):
+    """
+    Prints the functions whose internal time or number of calls grew by more than tolerance compared to baseline
+    Calls do not depend on the machine for a given seed, times do: only calls count as a regression, times are printed
+    for information
+    :return: True if the calls of a function regressed
+    :rtype: Bool
+    """
+    regressed = False
+    for name, now in sorted(current["functions"].items()):
+        before = baseline["functions"].get(name)
+        if before is None:
+            print("new       %s" % name)
+        elif now["calls"] > before["calls"] * (1 + tolerance):
+            print("calls     %s: %d -> %d REGRESSION" % (name, before["calls"], now["calls"]))
+            regressed = True
+        elif now["tottime"] > before["tottime"] * (1 + tolerance) and now["tottime"] - before["tottime"] > 0.01:
+            print("slower    %s: %.3fs -> %.3fs" % (name, before["tottime"], now["tottime"]))
+    print("total %.3fs, baseline %.3fs" % (current["total"], baseline["total"]))
+    return regressed
+
+
+def profile(out, steps, seed, baseline, saveBaseline, tolerance):
+    report = io.StringIO()
+    report.write("profile of %d steps of the default world of run.py, seed %d\n" % (steps, seed))
+    stats = pstats.Stats(profile_run(steps, seed), stream=report)
+    stats.sort_stats("tottime").print_stats()
+    with open(out, "w") as file:
+        file.write(report.getvalue())
+    print("profile -> %s" % out)
+    summary = summarize_profile(stats)
+    summary.update(steps=steps, seed=seed)
+    if saveBaseline:
+        with open(baseline, "w") as file:
+            json.dump(summary, file, indent=1, sort_keys=True)
+        print("baseline -> %s" % baseline)
+        return False
+    if not os.path.exists(baseline):
+        print("no baseline at %s, create it with --save-baseline" % baseline)
+        return False
+    with open(baseline) as file:
+        stored = json.load(file)
+    if (stored["steps"], stored["seed"]) != (steps, seed):
+        print("the baseline was made with %d steps and seed %d" % (stored["steps"], stored["seed"]))
+        return False
+    return compare_profiles(summary, stored, tolerance)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="benchmarks", description="Python-Ecosystem benchmarks")
+    parser.add_argument("benchmark", choices=("functions", "scaling", "profile", "memory"))
+    parser.add_argument("--seed", type=int, default=0, help="seed of the worlds")
+    parser.add_argument("--steps", type=int, help="steps per run (100 for scaling, 2000 for profile)")
+    parser.add_argument("--populations", type=int, nargs="+", default=[100, 1000, 5000],
+                        help="initial bunnies of the scaling benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 200, 1000], help="grid sizes of the scaling benchmark")
+    parser.add_argument("--engine", choices=("object", "vectorized"), default="object", help="engine of the scaling benchmark")
+    parser.add_argument("--target-refresh", type=int, default=0,
+                        help="targetRefresh of the scaling benchmark (see run.py)")
+    parser.add_argument("--out", default="profile.stat", help="text report of the profile benchmark")
+    parser.add_argument("--baseline", default=BASELINE, help="stored profile summary to compare to")
+    parser.add_argument("--save-baseline", action="store_true", help="store the profile summary as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="relative growth of the calls flagged as a regression, and of the times reported")
+    args = parser.parse_args(argv)
+    if args.benchmark == "functions":
+        functions(seed=args.seed)
+    elif args.benchmark == "scaling":
+        scaling(args.populations, args.sizes, args.steps or 100, args.seed, args.engine, args.target_refresh)
+    elif args.benchmark == "profile":
+        if profile(args.out, args.steps or 2000, args.seed, args.baseline, args.save_baseline, args.tolerance):
+            sys.exit(1)
+    else:
+        memory()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Python-Ecosystem by Alexandre Sajus
+
+More information at:
+https://github.com/AlexandreSajus/PythonEcosystem
+
+checkpoint.py saves a running world to a .npz file and restores it, so a long run can be paused and resumed
+Agents are stored as one array per attribute (not pickled one by one) with the time, the state of the random
+generator and the time series collected so far. A restored world continues exactly as the saved one would have
+"""
+
+import json
+
+import numpy as np
+
+import sharded
+import vectorized
+from agents import Bunny, Fox
+from pool import AgentPool
+from randomness import BatchedRandom
+from registry import AgentRegistry
+from topology import Topology
+
+BUNNY_FIELDS = ("id", "x", "y", "speed", "visibility", "gestChance", "gestStatus", "gestNumber", "age")
+FOX_FIELDS = BUNNY_FIELDS + ("huntStatus", "hunger", "hungerThresMin", "hungerThresMax", "hungerReward", "maxHunger")
+# cached targets of detect_prey (see agents.py), one per species searched in IS_PREY order: id of the target (-1 for
+# none in range, -2 for no target), steps since the scan, position of the agent at the scan and distance bounding the
+# agents not chosen
+TARGET_FIELDS = tuple(species + field for species in ("fox", "bunny")
+                      for field in ("TargetId", "TargetElapsed", "TargetX", "TargetY", "TargetBound"))
+
+
+def target_fields(agent, now):
+    """
+    :return: values of TARGET_FIELDS for the targets of agent at step now
+    :rtype: Tuple
+    """
+    values = ()
+    for target in agent.target:
+        if target is None:
+            values += (-2, 0, 0, 0, 0.0)
+            continue
+        prey, key, since, x, y, bound = target
+        if prey is not None and (prey.diedAt is not None or prey.id != key):
+            values += (-2, 0, 0, 0, 0.0)  # a dead target is searched again, like no target
+        else:
+            values += (-1 if prey is None else key, now - since, x, y, bound)
+    return values
+
+
+def restore_target(agent, values, liveAgents):
+    """
+    Gives back to agent the targets saved by target_fields
+    """
+    for is_prey in (False, True):
+        key, elapsed, x, y, bound = values[5 * is_prey:5 * is_prey + 5]
+        if key >= -1:
+            prey = None if key < 0 else liveAgents[key]
+            agent.target[is_prey] = (prey, None if key < 0 else key, liveAgents.clock.now - elapsed, x, y, bound)
+
+
+def save(path, t, state, liveAgents, series=None, params=None):
+    """
+    Saves a world
+    :param t: time of the next step
+    :type t: Int
+    :param state: state, the occupancy grid of the world
+    :type state: Array
+    :param liveAgents: AgentRegistry of the object engine or VectorWorld of the vectorized engine (the sharded engine
+    can't be saved)
+    :param series: time series collected so far, for example the ones of ecosystem.simulate
+    :type series: Dict
+    :param params: parameters of the world (see run.parameters)
+    :type params: Dict
+    """
+    if isinstance(liveAgents, sharded.ShardedWorld):
+        raise ValueError("worlds of the sharded engine can't be saved, their random generators live in the workers")
+    arrays = {"t": t, "shape": state.shape, "params": json.dumps(params)}
+    if isinstance(liveAgents, vectorized.VectorWorld):
+        arrays["engine"] = "vectorized"
+        arrays["rng"] = json.dumps(liveAgents.rng.bit_generator.state)
+        for prefix, herd in (("bunny_", liveAgents.bunnies), ("fox_", liveAgents.foxes)):
+            for name in herd.names:
+                arrays[prefix + name] = getattr(herd, name)
+    else:
+        arrays["engine"] = "object"
+        arrays["rng"] = json.dumps(liveAgents.rng.getstate())
+        arrays["nextId"] = liveAgents.nextId
+        for prefix, is_prey, fields in (("bunny_", True, BUNNY_FIELDS), ("fox_", False, FOX_FIELDS)):
+            # agents are saved in id order, the order in which they act
+            agents = sorted(liveAgents.species(is_prey), key=lambda agent: agent.id)
+            for name in fields:
+                arrays[prefix + name] = np.array([getattr(agent, name) for agent in agents])
+            targets = [target_fields(agent, liveAgents.clock.now) for agent in agents]
+            for i, name in enumerate(TARGET_FIELDS):
+                arrays[prefix + name] = np.array([target[i] for target in targets])
+        arrays["minSpeed"] = np.array([liveAgents.minSpeed[True], liveAgents.minSpeed[False]], dtype=float)
+    if series is not None:
+        arrays["series"] = json.dumps(list(series))
+        for name, values in series.items():
+            arrays["series_" + name] = values
+    np.savez(path, **arrays)
+
+
+def load(path):
+    """
+    Restores a world saved by save
+    :return: t, state, liveAgents, series (None if none was saved) and params (None if none were saved)
+    :rtype: Tuple
+    """
+    with np.load(path) as file:
+        arrays = {name: file[name] for name in file.files}
+    t = int(arrays["t"])
+    h, w = (int(size) for size in arrays["shape"][:2])
+    params = json.loads(str(arrays["params"]))
+    if str(arrays["engine"]) == "vectorized":
+        rng = np.random.default_rng()
+        rng.bit_generator.state = json.loads(str(arrays["rng"]))
+        herds = [vectorized.Herd(**{name[len(prefix):]: values for name, values in arrays.items() if name.startswith(prefix)})
+                 for prefix in ("bunny_", "fox_")]
+        liveAgents = vectorized.VectorWorld(h, w, herds[0], herds[1], rng)
+        state = np.zeros((h, w, 2), dtype=np.int32)
+        vectorized.count_cells(state, liveAgents)
+    else:
+        rng = BatchedRandom()
+        rng.setstate(json.loads(str(arrays["rng"])))
+        state = np.zeros((h, w, 2), dtype=np.int32)
+        wrap = bool(params.get("wrap", False)) if params is not None else False
+        liveAgents = AgentRegistry(state, rng=rng, pool=AgentPool(), topology=Topology(h, w, wrap))
+        if params is not None:
+            liveAgents.targetRefresh = params.get("targetRefresh", liveAgents.targetRefresh)
+            liveAgents.targetSlack = params.get("targetSlack", liveAgents.targetSlack)
+        agents = []
+        targets = []
+        for cls, prefix, fields in ((Bunny, "bunny_", BUNNY_FIELDS), (Fox, "fox_", FOX_FIELDS)):
+            # tolist gives back native Python numbers, so the restored agents behave exactly like the saved ones
+            columns = {name: arrays[prefix + name].tolist() for name in fields}
+            start = len(agents)
+            for i, id in enumerate(columns.pop("id")):
+                agents.append((id, cls(**{name: values[i] for name, values in columns.items()})))
+            if prefix + TARGET_FIELDS[0] in arrays:  # older checkpoints have no targets
+                targets += zip([agent for id, agent in agents[start:]],
+                               zip(*[arrays[prefix + name].tolist() for name in TARGET_FIELDS]))
+        for id, agent in sorted(agents, key=lambda pair: pair[0]):
+            liveAgents.add(agent, id)
+        liveAgents.nextId = int(arrays["nextId"])
+        # the caches of detect_prey, so the resumed run searches exactly when the uninterrupted one does
+        for agent, values in targets:
+            restore_target(agent, values, liveAgents)
+        if "minSpeed" in arrays:
+            liveAgents.minSpeed[True], liveAgents.minSpeed[False] = arrays["minSpeed"].tolist()
+    series = None
+    if "series" in arrays:
+        series = {name: arrays["series_" + name] for name in json.loads(str(arrays["series"]))}
+    return t, state, liveAgents, series, params
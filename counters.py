@@ -0,0 +1,162 @@
+"""
+Python-Ecosystem by Alexandre Sajus
+
+More information at:
+https://github.com/AlexandreSajus/PythonEcosystem
+
+counters.py takes care of the statistics of the simulation: counters updated on every birth and death, and time series
+stored in preallocated NumPy buffers
+"""
+
+import numpy as np
+
+
+class Counters:
+    """
+    Population and bunny speed counters, updated by the AgentRegistry on every birth and death so reading them is O(1)
+    Ages and hungers change on every step, so they are counted by the step on which they reach 0 (diesAt and starvesAt,
+    see agents.py), which only changes when a fox eats (see fed): the distribution of the ages of a species is then read
+    from at most one entry per step left to live, whatever the number of agents (see analytics.py)
+    Also counts the searches of detect_prey answered by the cached target of the agent (hits) or by a scan
+    """
+
+    def __init__(self):
+        self.bunnies = 0
+        self.foxes = 0
+        self.speedSum = 0  # sum of the speeds of the live bunnies
+        self.speedCounts = []  # speedCounts[s] is the number of live bunnies of speed s
+        self.diesAt = {True: {}, False: {}}  # per IS_PREY, step of death by age -> number of live agents
+        self.starvesAt = {}  # step of death by hunger -> number of live foxes
+        self.targetHits = 0
+        self.targetScans = 0
+
+    def born(self, agent):
+        tally(self.diesAt[agent.IS_PREY], agent.diesAt, 1)
+        if agent.IS_PREY:
+            self.bunnies += 1
+            self.speedSum += agent.speed
+            if agent.speed >= len(self.speedCounts):
+                self.speedCounts.extend([0] * (agent.speed + 1 - len(self.speedCounts)))
+            self.speedCounts[agent.speed] += 1
+        else:
+            self.foxes += 1
+            tally(self.starvesAt, agent.starvesAt, 1)
+
+    def died(self, agent):
+        tally(self.diesAt[agent.IS_PREY], agent.diesAt, -1)
+        if agent.IS_PREY:
+            self.bunnies -= 1
+            self.speedSum -= agent.speed
+            self.speedCounts[agent.speed] -= 1
+        else:
+            self.foxes -= 1
+            tally(self.starvesAt, agent.starvesAt, -1)
+
+    def fed(self, agent, starvesAt):
+        """
+        Moves the live fox agent, which was starving on step starvesAt, to its new step of starvation
+        """
+        tally(self.starvesAt, starvesAt, -1)
+        tally(self.starvesAt, agent.starvesAt, 1)
+
+    def average_speed(self):
+        return self.speedSum / max(self.bunnies, 0.1)
+
+    def target_hit_rate(self):
+        """
+        :return: share of the searches of detect_prey that did not need to scan
+        :rtype: Float
+        """
+        return self.targetHits / max(self.targetHits + self.targetScans, 1)
+
+    def speed_histogram(self):
+        """
+        :return: number of live bunnies per speed, indexed by speed
+        :rtype: Array
+        """
+        return np.array(self.speedCounts, dtype=np.int64)
+
+
+def tally(counts, key, n):
+    """
+    Adds n to counts[key], removing the keys counting 0
+    """
+    total = counts.get(key, 0) + n
+    if total:
+        counts[key] = total
+    else:
+        del counts[key]
+
+
+class TimeSeries:
+    """
+    Named columns with one value appended per tick, stored in NumPy buffers that double in size when full
+    so appending is O(1) amortized and reading a column returns a view without copying
+    """
+
+    def __init__(self, names, capacity=1024, dtype=float):
+        self.names = tuple(names)
+        self.length = 0
+        self.buffers = {name: np.empty(capacity, dtype=dtype) for name in self.names}
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, name):
+        return self.buffers[name][:self.length]
+
+    def append(self, *values):
+        """
+        Appends one value per column, in the order of names
+        """
+        if self.length == len(self.buffers[self.names[0]]):
+            for name in self.names:
+                grown = np.empty(max(2 * self.length, 1), dtype=self.buffers[name].dtype)
+                grown[:self.length] = self.buffers[name]
+                self.buffers[name] = grown
+        for name, value in zip(self.names, values):
+            self.buffers[name][self.length] = value
+        self.length += 1
+
+    def extend(self, *columns):
+        """
+        Appends several values per column, one array per column in the order of names
+        """
+        for values in zip(*columns):
+            self.append(*values)
+
+    def clear(self):
+        self.length = 0
+
+    def as_dict(self):
+        return {name: self[name] for name in self.names}
+
+
+class RingBuffer(TimeSeries):
+    """
+    Time series keeping only the last capacity values of each column, for live views of long runs
+    Every value is written twice, capacity apart, so the last values are always a contiguous view
+    """
+
+    def __init__(self, names, capacity=5000, dtype=float):
+        self.capacity = capacity
+        self.total = 0  # number of values appended since the creation
+        super(RingBuffer, self).__init__(names, 2 * capacity, dtype)
+
+    def __getitem__(self, name):
+        # the last values end at the second copy of the latest one
+        end = self.total % self.capacity + self.capacity
+        return self.buffers[name][end - self.length:end]
+
+    def clear(self):
+        self.length = 0
+        self.total = 0
+
+    def append(self, *values):
+        i = self.total % self.capacity
+        for name, value in zip(self.names, values):
+            buffer = self.buffers[name]
+            buffer[i] = value
+            buffer[i + self.capacity] = value
+        self.total += 1
+        self.length = min(self.total, self.capacity)
@@ -0,0 +1,208 @@
+"""
+Python-Ecosystem by Alexandre Sajus
+
+More information at:
+https://github.com/AlexandreSajus/PythonEcosystem
+
+ecosystem.py runs the simulation from the command line without rendering it:
+    python -m ecosystem run --steps 100000 --out stats.npz
+    python -m ecosystem sweep --grid grid.json --seeds 0 1 2 3 --steps 20000 --out sweep.csv
+    python -m ecosystem run --steps 100000 --record run.rec
+    python -m ecosystem run --steps 100000 --checkpoint world.npz --checkpoint-every 10000
+    python -m ecosystem run --steps 200000 --resume world.npz
+    python -m ecosystem replay run.rec --out run.gif --start 1000 --stop 2000
+    python -m ecosystem view
+    python -m ecosystem view --every 10
+"""
+
+import argparse
+import json
+
+import numpy as np
+
+import checkpoint
+import run
+import sharded
+
+
+def simulate(steps, params=None, engine=None, seed=None, record=None, recordEvery=1, checkpointPath=None,
+             checkpointEvery=1000, resume=None, tiles=None, traits=None):
+    """
+    Runs a new world for a number of steps at full speed, without rendering
+    The simulation stops early if every agent is dead
+    :param steps: number of steps
+    :type steps: Int
+    :param params: parameters of the world (see run.parameters), the default ones if None
+    :type params: Dict
+    :param engine: "object", "vectorized" or "sharded", the engine of run.py if None
+    :type engine: String
+    :param seed: seed of the random generators, None for a random seed
+    :type seed: Int
+    :param record: path of a recording of the positions of the agents (see recording.py), None to record nothing
+    :type record: String
+    :param recordEvery: steps between two recorded frames
+    :type recordEvery: Int
+    :param checkpointPath: path where the world is saved every checkpointEvery steps (see checkpoint.py), None to never save
+    :type checkpointPath: String
+    :param checkpointEvery: steps between two checkpoints
+    :type checkpointEvery: Int
+    :param resume: path of a checkpoint to continue instead of starting a new world, params, engine and seed are then
+    those of the checkpoint
+    :type resume: String
+    :param tiles: number of tiles (and processes) of the sharded engine, the number of cores if None
+    :type tiles: Int
+    :param traits: sampler of the distributions of the traits, ticked after every step (see analytics.py), None to
+    sample nothing
+    :type traits: TraitSampler
+    :return: time series t, popBunny, popFox and speed (average bunny speed)
+    :rtype: Dict
+    """
+    T = np.arange(1, steps + 1)
+    popBunny = np.zeros(steps, dtype=np.int64)
+    popFox = np.zeros(steps, dtype=np.int64)
+    speed = np.zeros(steps)
+    start = 0
+    if resume:
+        start, state, liveAgents, series, params = checkpoint.load(resume)
+        popBunny[:start], popFox[:start], speed[:start] = series["popBunny"], series["popFox"], series["speed"]
+    else:
+        params = params or run.parameters()
+        state, liveAgents = run.new_world(params, engine, seed, tiles)
+    recorder = None
+    if record:
+        from recording import Recorder
+        h, w = (liveAgents.h, liveAgents.w) if state is None else state.shape[:2]  # no state for the sharded engine
+        recorder = Recorder(record, w, h)
+    try:
+        for t in range(start, steps):
+            state = run.step(t, state, liveAgents, params["age_fox"])
+            popBunny[t], popFox[t], speed[t] = run.count(liveAgents)
+            if traits:
+                traits.tick(t + 1, liveAgents)
+            if recorder and (t + 1) % recordEvery == 0:
+                recorder.record(t + 1, liveAgents)
+            if checkpointPath and (t + 1) % checkpointEvery == 0:
+                series = {"popBunny": popBunny[:t + 1], "popFox": popFox[:t + 1], "speed": speed[:t + 1]}
+                checkpoint.save(checkpointPath, t + 1, state, liveAgents, series, params)
+            if popBunny[t] == popFox[t] == 0:
+                steps = t + 1
+                break
+    finally:
+        if recorder:
+            recorder.close()
+        if isinstance(liveAgents, sharded.ShardedWorld):
+            liveAgents.close()
+    return {"t": T[:steps], "popBunny": popBunny[:steps], "popFox": popFox[:steps], "speed": speed[:steps]}
+
+
+def load_config(path):
+    """
+    Reads a JSON file of parameters overriding the default ones of run.py, for example {"speed_fox": 3}
+    :return: parameters of the world
+    :rtype: Dict
+    """
+    if path is None:
+        return run.parameters()
+    with open(path) as file:
+        return run.parameters(**json.load(file))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="ecosystem", description="Python-Ecosystem simulation")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    runParser = commands.add_parser("run", help="run a simulation without rendering and save its time series")
+    runParser.add_argument("--steps", type=int, default=5000, help="number of steps")
+    runParser.add_argument("--out", default="stats.npz", help="output .npz file")
+    runParser.add_argument("--config", help="JSON file of parameters overriding the defaults of run.py")
+    runParser.add_argument("--engine", choices=("object", "vectorized", "sharded"), help="simulation engine")
+    runParser.add_argument("--tiles", type=int, help="number of tiles and processes of the sharded engine")
+    runParser.add_argument("--seed", type=int, help="random seed")
+    runParser.add_argument("--record", help="binary file recording the positions of the agents")
+    runParser.add_argument("--record-every", type=int, default=1, help="steps between two recorded frames")
+    runParser.add_argument("--checkpoint", help="file where the world is saved every --checkpoint-every steps")
+    runParser.add_argument("--checkpoint-every", type=int, default=1000, help="steps between two checkpoints")
+    runParser.add_argument("--resume", help="checkpoint to continue, up to --steps steps in total")
+    runParser.add_argument("--traits", help="JSON lines file receiving the distributions of the traits (see analytics.py)")
+    runParser.add_argument("--traits-every", type=int, default=100, help="steps between two lines of --traits")
+    runParser.add_argument("--metrics", help="JSON lines file receiving the time spent per phase (see metrics.py)")
+    runParser.add_argument("--metrics-every", type=int, default=1000, help="steps between two lines of --metrics")
+
+    replayParser = commands.add_parser("replay", help="render or analyse a recording without re-running it")
+    replayParser.add_argument("recording", help="file written by run --record")
+    replayParser.add_argument("--out", help="output .gif or .mp4 video")
+    replayParser.add_argument("--stats", help="output .npz file of the populations and speed of every frame")
+    replayParser.add_argument("--start", type=int, default=0, help="first time step")
+    replayParser.add_argument("--stop", type=int, help="last time step (excluded)")
+    replayParser.add_argument("--every", type=int, default=1, help="render one frame out of EVERY")
+    replayParser.add_argument("--fps", type=int, default=30, help="frames per second of the video")
+
+    sweepParser = commands.add_parser("sweep", help="run a grid of parameters for several seeds on every core")
+    sweepParser.add_argument("--grid", required=True,
+                             help='JSON file of lists of values per parameter, for example {"speed_fox": [3, 4]}')
+    sweepParser.add_argument("--seeds", type=int, nargs="+", default=[0], help="seeds of the runs of each combination")
+    sweepParser.add_argument("--steps", type=int, default=5000, help="number of steps of each run")
+    sweepParser.add_argument("--out", default="sweep.csv", help="output .csv file, one line per run")
+    sweepParser.add_argument("--engine", choices=("object", "vectorized", "replicas"),
+                             help="simulation engine, replicas runs the seeds of a combination as one vectorized batch")
+    sweepParser.add_argument("--processes", type=int, help="number of worker processes, every core by default")
+
+    viewParser = commands.add_parser("view", help="animate a simulation with matplotlib")
+    viewParser.add_argument("--frames", type=int, default=600, help="number of steps to animate")
+    viewParser.add_argument("--every", type=int,
+                            help="simulate at full speed in a worker process and draw a snapshot every EVERY steps")
+    viewParser.add_argument("--config", help="JSON file of parameters overriding the defaults of run.py (with --every)")
+    viewParser.add_argument("--engine", choices=("object", "vectorized"), help="simulation engine (with --every)")
+    viewParser.add_argument("--seed", type=int, help="random seed (with --every)")
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        params = load_config(args.config)
+        traits = None
+        if args.traits:
+            from analytics import TraitSampler
+            traits = TraitSampler(params, args.traits_every, args.traits)
+        metrics = None
+        if args.metrics:
+            from metrics import Metrics
+            metrics = Metrics(args.metrics_every, args.metrics)
+            metrics.install()
+        try:
+            series = simulate(args.steps, params, args.engine, args.seed, args.record, args.record_every,
+                              args.checkpoint, args.checkpoint_every, args.resume, args.tiles, traits)
+        finally:
+            if metrics:
+                metrics.uninstall()
+            if traits:
+                traits.close()
+        if metrics:
+            print(metrics.report())
+        np.savez(args.out, **series)
+        print("%d steps, %d bunnies, %d foxes -> %s" % (
+            len(series["t"]), series["popBunny"][-1], series["popFox"][-1], args.out))
+    elif args.command == "sweep":
+        import sweep
+        with open(args.grid) as file:
+            grid = json.load(file)
+        results = sweep.sweep(grid, args.seeds, args.steps, args.engine, args.processes, args.out)
+        print("%d runs -> %s" % (len(results), args.out))
+    elif args.command == "replay":
+        from recording import Replay
+        with Replay(args.recording) as replay:
+            start = replay.seek(args.start)
+            stop = len(replay) if args.stop is None else replay.seek(args.stop - 1) + 1
+            if args.stats:
+                np.savez(args.stats, **replay.statistics(start, stop))
+                print("%d frames -> %s" % (stop - start, args.stats))
+            if args.out:
+                replay.export_video(args.out, start, stop, args.every, args.fps)
+                print("%d frames -> %s" % (len(range(start, stop, args.every)), args.out))
+    elif args.every:
+        import viewer
+        viewer.main(args.every, None, load_config(args.config), args.engine, args.seed)
+    else:
+        run.main(frames=args.frames)
+
+
+if __name__ == "__main__":
+    main()
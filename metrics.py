@@ -0,0 +1,222 @@
+"""
+Python-Ecosystem by Alexandre Sajus
+
+More information at:
+https://github.com/AlexandreSajus/PythonEcosystem
+
+metrics.py takes care of measuring where the time of a run goes, phase by phase (searches, movement, births, deaths...)
+The functions of the phases are only wrapped while a Metrics object is installed, a run without metrics executes the
+original functions and pays nothing
+
+    with Metrics(every=1000, out="metrics.jsonl") as metrics:
+        ecosystem.simulate(10000)
+    print(metrics.report())
+"""
+
+import functools
+import json
+import time
+
+import agents
+import registry
+import run
+import vectorized
+
+# (owner, attribute, phase): the functions timed by Metrics, both engines included
+HOOKS = (
+    (run, "step", "step"),
+    (run, "update_state", "update_state"),
+    (run, "count", "count"),
+    (run, "export", "export"),
+    (registry.AgentRegistry, "grow_older", "aging"),
+    (registry.AgentRegistry, "remove", "deaths"),
+    (registry.AgentRegistry, "add", "births"),
+    (agents.Bunny, "clone", "births"),
+    (agents.Fox, "clone", "births"),
+    (agents, "detect_prey", "detect_prey"),
+    (agents, "move_towards", "movement"),
+    (agents, "random_movement", "movement"),
+    (registry.AgentRegistry, "relocate", "relocate"),
+    (vectorized, "age_herds", "aging"),
+    (vectorized, "nearest", "detect_prey"),
+    (vectorized, "move_towards", "movement"),
+    (vectorized, "random_movement", "movement"),
+    (vectorized.Herd, "extend", "births"),
+    (vectorized, "count_cells", "update_state"),
+)
+
+
+class Metrics:
+    """
+    Wall time and calls per phase, candidates yielded by the spatial index to detect_prey and hits of the cache of
+    agents.distance, gathered while installed (see install or use it as a context manager)
+    Times are inclusive: step contains every other phase, and a phase nested in itself (random_movement called by
+    move_towards) is only timed once
+    Every every ticks (see tick) the metrics of the last ticks are written as one JSON line to out and reset
+    Only the parent process is measured: the phases run by the workers of the sharded engine are not counted
+    """
+
+    def __init__(self, every=1000, out=None):
+        """
+        :param every: ticks between two dumps, 0 to never dump
+        :type every: Int
+        :param out: path of a JSON lines file or open text file receiving the dumps, None to keep them in dumps
+        :type out: String or File
+        """
+        self.every = every
+        self.out = out
+        self.file = None
+        self.dumps = []
+        self.originals = []
+        self.phases = {}  # phase -> [calls, seconds, depth]
+        self.reset()
+
+    def __enter__(self):
+        self.install()
+        return self
+
+    def __exit__(self, *exc):
+        self.uninstall()
+
+    def reset(self):
+        """
+        Starts a new window of measures
+        """
+        for stat in self.phases.values():
+            stat[:2] = 0, 0.0
+        self.ticks = 0
+        self.candidates = 0
+        self.scans = 0
+        self.distanceInfo = agents.distance.cache_info()
+
+    def install(self):
+        """
+        Replaces the functions of HOOKS by timed ones, run.step also ticks after every step
+        """
+        if self.originals:
+            return
+        for owner, name, phase in HOOKS:
+            function = owner.__dict__[name]
+            self.originals.append((owner, name, function))
+            setattr(owner, name, self.timed(phase, function))
+        step = run.step
+        registry.AgentRegistry.nearby = self.counted(registry.AgentRegistry.nearby)
+        self.originals.append((registry.AgentRegistry, "nearby", registry.AgentRegistry.nearby.__wrapped__))
+
+        @functools.wraps(step)
+        def ticking(t, *args, **kwargs):
+            state = step(t, *args, **kwargs)
+            self.tick(t + 1)
+            return state
+        run.step = ticking
+        if isinstance(self.out, str):
+            self.file = open(self.out, "a")
+
+    def uninstall(self):
+        """
+        Restores the original functions
+        """
+        for owner, name, function in reversed(self.originals):
+            setattr(owner, name, function)
+        self.originals = []
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def timed(self, phase, function):
+        stat = self.phases.setdefault(phase, [0, 0.0, 0])
+        clock = time.perf_counter
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            stat[0] += 1
+            if stat[2]:
+                return function(*args, **kwargs)
+            stat[2] = 1
+            start = clock()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                stat[1] += clock() - start
+                stat[2] = 0
+        return wrapper
+
+    def counted(self, nearby):
+        @functools.wraps(nearby)
+        def wrapper(*args):
+            self.scans += 1
+            for item in nearby(*args):
+                self.candidates += 1
+                yield item
+        return wrapper
+
+    def tick(self, t):
+        """
+        Counts one step, and dumps the metrics of the window if t is a multiple of every
+        :param t: number of steps done so far
+        :type t: Int
+        """
+        self.ticks += 1
+        if self.every and t % self.every == 0:
+            self.dump(t)
+
+    def snapshot(self):
+        """
+        :return: metrics of the current window, seconds and calls per phase
+        :rtype: Dict
+        """
+        info = agents.distance.cache_info()
+        hits, misses = info.hits - self.distanceInfo.hits, info.misses - self.distanceInfo.misses
+        return {
+            "ticks": self.ticks,
+            "phases": {phase: {"calls": calls, "seconds": seconds} for phase, (calls, seconds, _) in self.phases.items()
+                       if calls},
+            "scans": self.scans,
+            "candidates": self.candidates,
+            "distanceCache": {"hits": hits, "misses": misses},
+        }
+
+    def summary(self):
+        """
+        :return: metrics of every window since the creation, summed (same keys as snapshot)
+        :rtype: Dict
+        """
+        summary = {"ticks": 0, "phases": {}, "scans": 0, "candidates": 0, "distanceCache": {"hits": 0, "misses": 0}}
+        for window in self.dumps + [self.snapshot()]:
+            for name in ("ticks", "scans", "candidates"):
+                summary[name] += window[name]
+            for phase, stat in window["phases"].items():
+                total = summary["phases"].setdefault(phase, {"calls": 0, "seconds": 0.0})
+                total["calls"] += stat["calls"]
+                total["seconds"] += stat["seconds"]
+            for name in ("hits", "misses"):
+                summary["distanceCache"][name] += window["distanceCache"][name]
+        return summary
+
+    def dump(self, t):
+        """
+        Writes the metrics of the window with the time t and starts a new window
+        """
+        snapshot = dict(t=t, **self.snapshot())
+        self.dumps.append(snapshot)
+        out = self.file or (None if self.out is None or isinstance(self.out, str) else self.out)
+        if out is not None:
+            out.write(json.dumps(snapshot) + "\n")
+            out.flush()
+        self.reset()
+
+    def report(self):
+        """
+        :return: table of the metrics since the creation, the slowest phases first
+        :rtype: String
+        """
+        snapshot = self.summary()
+        lines = ["%-14s %10s %10s %12s" % ("phase", "calls", "seconds", "us/call")]
+        for phase, stat in sorted(snapshot["phases"].items(), key=lambda item: -item[1]["seconds"]):
+            lines.append("%-14s %10d %10.3f %12.2f" % (phase, stat["calls"], stat["seconds"],
+                                                        1e6 * stat["seconds"] / stat["calls"]))
+        cache = snapshot["distanceCache"]
+        lines.append("%d ticks, %d scans of %.1f candidates, distance cache %d hits / %d misses (%.0f%%)" % (
+            snapshot["ticks"], snapshot["scans"], snapshot["candidates"] / max(snapshot["scans"], 1), cache["hits"],
+            cache["misses"], 100 * cache["hits"] / max(cache["hits"] + cache["misses"], 1)))
+        return "\n".join(lines)
@@ -0,0 +1,55 @@
+"""
+Python-Ecosystem by Alexandre Sajus
+
+More information at:
+https://github.com/AlexandreSajus/PythonEcosystem
+
+pool.py takes care of recycling the dead agents: newborns are re-initialized in place in the objects of dead agents
+instead of new ones, so booms and busts of the populations do not churn the allocator and the garbage collector
+"""
+
+
+class AgentPool:
+    """
+    Dead agents waiting to be reused, per class
+    The AgentRegistry only releases an agent once nothing can read it as a live agent anymore (see
+    AgentRegistry.recycle), the pool keeps its peak size so memory stays flat over the following cycles
+    """
+
+    def __init__(self):
+        self.free = {}  # class -> list of dead agents
+        self.created = 0  # agents allocated by take
+        self.reused = 0  # agents handed out again by take
+        self.released = 0  # agents given back by release
+
+    def __len__(self):
+        return sum(len(agents) for agents in self.free.values())
+
+    def take(self, cls):
+        """
+        :return: a dead agent of class cls, or a new one if there is none, to initialize with cls.__init__
+        :rtype: Object
+        """
+        free = self.free.get(cls)
+        if free:
+            self.reused += 1
+            return free.pop()
+        self.created += 1
+        return cls.__new__(cls)
+
+    def release(self, agents):
+        """
+        Gives dead agents back to the pool
+        """
+        for agent in agents:
+            self.free.setdefault(type(agent), []).append(agent)
+        self.released += len(agents)
+
+    def stats(self):
+        """
+        :return: free agents, agents allocated, reused and released so far and the share of the births that reused
+        an agent
+        :rtype: Dict
+        """
+        return {"free": len(self), "created": self.created, "reused": self.reused, "released": self.released,
+                "reuseRate": self.reused / max(self.created + self.reused, 1)}
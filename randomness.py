@@ -0,0 +1,72 @@
+"""
+Python-Ecosystem by Alexandre Sajus
+
+More information at:
+https://github.com/AlexandreSajus/PythonEcosystem
+
+randomness.py takes care of drawing the random numbers of the object engine in blocks with NumPy
+Every random decision of the agents is a single cheap call handing out the next pre-drawn uniform
+"""
+
+import itertools
+import operator
+
+import numpy as np
+
+
+class BatchedRandom:
+    """
+    Random generator handing out uniforms pre-drawn blockSize at a time by a NumPy Generator
+    random() is a C level call (the __next__ of an iterator over the current block), so drawing costs about as much
+    as reading a list
+    """
+
+    def __init__(self, seed=None, blockSize=4096):
+        self.generator = np.random.default_rng(seed)
+        self.blockSize = blockSize
+        self.restart(0)
+
+    def blocks(self):
+        while True:
+            # the state before the draw is enough to draw the block again (see getstate)
+            self.blockState = self.generator.bit_generator.state
+            self.block = iter(self.generator.random(self.blockSize).tolist())
+            yield self.block
+
+    def restart(self, consumed):
+        """
+        Starts handing out the uniforms again from the current state of the generator, skipping the first consumed ones
+        """
+        self.blockState = self.generator.bit_generator.state
+        self.block = iter(())
+        self.random = itertools.chain.from_iterable(self.blocks()).__next__
+        for i in range(consumed):
+            self.random()
+
+    def randrange(self, n):
+        """
+        :return: uniform integer in [0, n)
+        :rtype: Int
+        """
+        return int(self.random() * n)
+
+    def randint(self, a, b):
+        """
+        :return: uniform integer in [a, b], like random.randint
+        :rtype: Int
+        """
+        return a + int(self.random() * (b - a + 1))
+
+    def getstate(self):
+        """
+        :return: state of the generator when the current block was drawn and the number of uniforms consumed since
+        :rtype: Dict
+        """
+        remaining = operator.length_hint(self.block)
+        consumed = self.blockSize - remaining if remaining or self.blockState != self.generator.bit_generator.state else 0
+        return {"generator": self.blockState, "blockSize": self.blockSize, "consumed": consumed}
+
+    def setstate(self, state):
+        self.blockSize = state["blockSize"]
+        self.generator.bit_generator.state = state["generator"]
+        self.restart(state["consumed"])
@@ -0,0 +1,237 @@
+"""
+Python-Ecosystem by Alexandre Sajus
+
+More information at:
+https://github.com/AlexandreSajus/PythonEcosystem
+
+recording.py records the positions of the agents in a compact binary file and replays it without re-running the
+simulation. The file is read through a memory map, so runs of millions of steps are never loaded in RAM
+    python -m ecosystem run --steps 100000 --record run.rec
+    python -m ecosystem replay run.rec --out run.gif --start 1000 --stop 2000
+
+Layout of the file (little endian):
+    header: HEADER
+    chunks: CHUNK, then ticks (u8 per frame), counts (u4 per frame), then the records of every frame (RECORD or
+    RECORD_TRAITS), a frame being the agents alive at one recorded tick
+"""
+
+import mmap
+
+import numpy as np
+
+import sharded
+import vectorized
+from registry import LAYER
+
+MAGIC = b"ECOREC1\0"
+CHUNK_MAGIC = b"CHNK"
+HEADER = np.dtype([("magic", "S8"), ("w", "<u4"), ("h", "<u4"), ("traits", "<u4")])
+CHUNK = np.dtype([("magic", "S4"), ("frames", "<u4")])
+RECORD = np.dtype([("x", "<u2"), ("y", "<u2"), ("species", "u1")])  # species 0 for bunnies, 1 for foxes
+RECORD_TRAITS = np.dtype([("x", "<u2"), ("y", "<u2"), ("species", "u1"), ("speed", "u1")])
+
+
+def agent_records(liveAgents, dtype):
+    """
+    :param liveAgents: AgentRegistry of the object engine, VectorWorld of the vectorized engine or ShardedWorld
+    :return: one record per live agent
+    :rtype: Array
+    """
+    if isinstance(liveAgents, sharded.ShardedWorld):
+        liveAgents = liveAgents.gather()
+    if isinstance(liveAgents, vectorized.VectorWorld):
+        herds = ((0, liveAgents.bunnies), (1, liveAgents.foxes))
+        records = np.empty(len(liveAgents.bunnies) + len(liveAgents.foxes), dtype=dtype)
+        start = 0
+        for species, herd in herds:
+            block = records[start:start + len(herd)]
+            block["x"], block["y"], block["species"] = herd.x, herd.y, species
+            if "speed" in dtype.names:
+                block["speed"] = herd.speed
+            start += len(herd)
+        return records
+    agents = list(liveAgents.values())
+    records = np.empty(len(agents), dtype=dtype)
+    records["x"] = [agent.x for agent in agents]
+    records["y"] = [agent.y for agent in agents]
+    records["species"] = [LAYER[agent.IS_PREY] for agent in agents]
+    if "speed" in dtype.names:
+        records["speed"] = [agent.speed for agent in agents]
+    return records
+
+
+class Recorder:
+    """
+    Appends frames to a recording, writing them one chunk of chunkFrames frames at a time
+    """
+
+    def __init__(self, path, w, h, traits=True, chunkFrames=1024):
+        self.dtype = RECORD_TRAITS if traits else RECORD
+        self.chunkFrames = chunkFrames
+        self.ticks = []
+        self.frames = []
+        self.file = open(path, "wb")
+        self.file.write(np.array((MAGIC, w, h, int(traits)), dtype=HEADER).tobytes())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def record(self, t, liveAgents):
+        """
+        Records the agents of liveAgents at time t
+        """
+        self.ticks.append(t)
+        self.frames.append(agent_records(liveAgents, self.dtype))
+        if len(self.frames) == self.chunkFrames:
+            self.flush()
+
+    def flush(self):
+        if not self.frames:
+            return
+        self.file.write(np.array((CHUNK_MAGIC, len(self.frames)), dtype=CHUNK).tobytes())
+        self.file.write(np.array(self.ticks, dtype="<u8").tobytes())
+        self.file.write(np.array([len(frame) for frame in self.frames], dtype="<u4").tobytes())
+        for frame in self.frames:
+            self.file.write(frame.tobytes())
+        self.ticks = []
+        self.frames = []
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+
+class Replay:
+    """
+    Reads a recording through a memory map. Only the chunk headers are read when opening it, frames are views of the map
+    """
+
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        header = np.frombuffer(self.map, dtype=HEADER, count=1)[0]
+        if header["magic"] != MAGIC.rstrip(b"\0"):
+            raise ValueError("%s is not a recording" % path)
+        self.w, self.h = int(header["w"]), int(header["h"])
+        self.dtype = RECORD_TRAITS if header["traits"] else RECORD
+        chunks = []  # (first frame, offset of the ticks, number of frames)
+        ticks = []
+        frames = 0
+        offset = HEADER.itemsize
+        while offset + CHUNK.itemsize <= len(self.map):
+            chunk = np.frombuffer(self.map, dtype=CHUNK, count=1, offset=offset)[0]
+            n = int(chunk["frames"])
+            start = offset + CHUNK.itemsize
+            if chunk["magic"] != CHUNK_MAGIC or start + 12 * n > len(self.map):
+                break  # truncated recording, keep the complete chunks
+            counts = np.frombuffer(self.map, dtype="<u4", count=n, offset=start + 8 * n)
+            end = start + 12 * n + int(counts.sum(dtype=np.int64)) * self.dtype.itemsize
+            if end > len(self.map):
+                break
+            chunks.append((frames, start, n))
+            ticks.append(np.frombuffer(self.map, dtype="<u8", count=n, offset=start))
+            frames += n
+            offset = end
+        self.chunks = chunks
+        self.firstFrames = np.array([chunk[0] for chunk in chunks], dtype=np.int64)
+        self.ticks = np.concatenate(ticks) if ticks else np.empty(0, dtype="<u8")
+
+    def __len__(self):
+        return len(self.ticks)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.ticks = None
+        try:
+            self.map.close()
+        except BufferError:
+            pass  # frames returned by frame are still in use, the map is closed when they are freed
+        self.file.close()
+
+    def frame(self, i):
+        """
+        :return: records of the agents of the i-th frame, a view of the memory map
+        :rtype: Array
+        """
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        c = int(np.searchsorted(self.firstFrames, i, side="right")) - 1
+        first, start, n = self.chunks[c]
+        counts = np.frombuffer(self.map, dtype="<u4", count=n, offset=start + 8 * n).astype(np.int64)
+        before = int(counts[:i - first].sum())
+        offset = start + 12 * n + before * self.dtype.itemsize
+        return np.frombuffer(self.map, dtype=self.dtype, count=int(counts[i - first]), offset=offset)
+
+    def seek(self, t):
+        """
+        :return: index of the last frame recorded at or before time t
+        :rtype: Int
+        """
+        return max(int(np.searchsorted(self.ticks, t, side="right")) - 1, 0)
+
+    def statistics(self, start=0, stop=None):
+        """
+        Computes the populations and the average bunny speed of every frame, one frame at a time
+        :return: time series t, popBunny, popFox and speed (if the recording has traits)
+        :rtype: Dict
+        """
+        stop = len(self) if stop is None else min(stop, len(self))
+        n = max(stop - start, 0)
+        series = {"t": self.ticks[start:stop].astype(np.int64), "popBunny": np.zeros(n, dtype=np.int64),
+                  "popFox": np.zeros(n, dtype=np.int64)}
+        if "speed" in self.dtype.names:
+            series["speed"] = np.zeros(n)
+        for i in range(n):
+            records = self.frame(start + i)
+            bunnies = records["species"] == 0
+            series["popBunny"][i] = bunnies.sum()
+            series["popFox"][i] = len(records) - series["popBunny"][i]
+            if "speed" in series:
+                series["speed"][i] = records["speed"][bunnies].sum(dtype=np.int64) / max(series["popBunny"][i], 0.1)
+        return series
+
+    def export_video(self, out, start=0, stop=None, every=1, fps=30):
+        """
+        Renders frames start to stop (one out of every) to a GIF or, with ffmpeg installed, an MP4, without a window
+        """
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.animation as animation
+        import matplotlib.pyplot as plt
+
+        import run
+        from counters import TimeSeries
+
+        stop = len(self) if stop is None else min(stop, len(self))
+        indices = range(start, stop, every)
+        fig, bunnies, foxes, popBunnyData, popFoxData, speedData = run.make_figure(plt)
+        bunnies.axes.set_xlim(0, self.w)
+        bunnies.axes.set_ylim(0, self.h)
+        series = TimeSeries(("T", "popBunny", "popFox", "speed"), capacity=len(indices))
+
+        def animate(i):
+            records = self.frame(i)
+            isBunny = records["species"] == 0
+            bunnies.set_offsets(np.column_stack((records["x"][isBunny], records["y"][isBunny])))
+            foxes.set_offsets(np.column_stack((records["x"][~isBunny], records["y"][~isBunny])))
+            nBunnies = int(isBunny.sum())
+            speed = records["speed"][isBunny].sum() / max(nBunnies, 0.1) if "speed" in records.dtype.names else 0
+            series.append(self.ticks[i], nBunnies, len(records) - nBunnies, speed)
+            popBunnyData.set_data(series["T"], series["popBunny"])
+            popFoxData.set_data(series["T"], series["popFox"])
+            speedData.set_data(series["T"], series["speed"])
+            return bunnies, foxes, popBunnyData, popFoxData, speedData,
+
+        ani = animation.FuncAnimation(fig, animate, frames=indices, blit=True, cache_frame_data=False)
+        writer = animation.FFMpegWriter(fps=fps) if out.endswith(".mp4") else animation.PillowWriter(fps=fps)
+        ani.save(out, writer=writer)
+        plt.close(fig)
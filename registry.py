@@ -0,0 +1,237 @@
+"""
+Python-Ecosystem by Alexandre Sajus
+
+More information at:
+https://github.com/AlexandreSajus/PythonEcosystem
+
+registry.py takes care of keeping track of the live agents: their ids, their order and their position in the spatial index
+"""
+
+from math import inf
+
+from counters import Counters
+from randomness import BatchedRandom
+from scheduler import ExpiryQueue, Scheduler
+from spatial import SpatialGrid
+from topology import Topology
+
+# layer of the occupancy grid of each species, indexed by IS_PREY
+LAYER = {True: 0, False: 1}
+
+
+class AgentRegistry:
+    """
+    Live agents with key=id_of_agent and value=agent, used where a dictionary liveAgents used to be
+    Every agent knows its own id, ids come from a counter so they increase with the date of birth,
+    adding and removing an agent is O(1) and each species has a SpatialGrid (indexed by IS_PREY)
+    The occupancy grid, if given, is kept up to date in place: occupancy[y, x, LAYER[is_prey]] is the number of
+    agents of the species standing on (x, y). The counters are updated on every birth and death
+    rng is the random generator of the world (BatchedRandom), every random decision of the agents is drawn from it
+    targetRefresh is the number of steps during which detect_prey keeps a live target in range without checking that
+    it is still the nearest, 0 to only keep the targets that provably are (same results as scanning every time)
+    targetSlack is the range searched by detect_prey beyond the visibility of the agent
+    pool, if given, receives the dead agents to re-initialize them as newborns (see recycle and pool.py)
+    topology is the geometry of the world (see topology.py), a bounded world of the shape of occupancy if None
+    """
+
+    def __init__(self, occupancy=None, cellSize=10, nextId=1, rng=None, targetRefresh=0, targetSlack=5, pool=None,
+                 topology=None):
+        self.occupancy = occupancy
+        self.rng = rng or BatchedRandom()
+        self.targetRefresh = targetRefresh
+        self.targetSlack = targetSlack
+        self.minSpeed = {True: inf, False: inf}  # lowest speed ever registered per species
+        self.positions = {}  # id -> (x, y) as counted in occupancy
+        self.cellSize = cellSize
+        self.nextId = nextId  # id of the next agent added
+        self.agents = {}
+        self.order = []  # agents in increasing id order, may still hold removed agents (see snapshot)
+        self.stale = 0  # number of removed agents still in order
+        self.epoch = 0  # incremented by every snapshot
+        self.iterating = 0  # number of running snapshots
+        self.pool = pool
+        if topology is None and occupancy is not None:
+            topology = Topology(*occupancy.shape[:2])
+        self.topology = topology
+        self.pending = []  # dead agents removed from order, waiting for recycle
+        self.grids = {True: SpatialGrid(cellSize), False: SpatialGrid(cellSize)}
+        self.scheduler = Scheduler()
+        self.clock = ExpiryQueue()  # steps aged so far and the agents by step of death
+        self.counters = Counters()
+
+    def __len__(self):
+        return len(self.agents)
+
+    def __iter__(self):
+        return iter(self.agents)
+
+    def __contains__(self, key):
+        return key in self.agents
+
+    def __getitem__(self, key):
+        return self.agents[key]
+
+    def get(self, key, default=None):
+        return self.agents.get(key, default)
+
+    def keys(self):
+        return self.agents.keys()
+
+    def values(self):
+        return self.agents.values()
+
+    def items(self):
+        return self.agents.items()
+
+    def add(self, agent, id=None):
+        """
+        Gives agent a new id, or id when restoring a saved agent, and registers it
+        :return: id of the agent
+        :rtype: Int
+        """
+        agent.id = self.nextId if id is None else id
+        agent.diedAt = None
+        agent.register(self.clock)
+        if agent.speed < self.minSpeed[agent.IS_PREY]:
+            self.minSpeed[agent.IS_PREY] = agent.speed
+        self.nextId = max(self.nextId, agent.id + 1)
+        self.agents[agent.id] = agent
+        self.order.append(agent)
+        self.grids[agent.IS_PREY].insert(agent.id, agent)
+        self.scheduler.insert(agent)
+        self.positions[agent.id] = (agent.x, agent.y)
+        if self.occupancy is not None:
+            self.occupancy[agent.y, agent.x, LAYER[agent.IS_PREY]] += 1
+        self.counters.born(agent)
+        return agent.id
+
+    def remove(self, agent):
+        """
+        Unregisters agent, does nothing if it is already dead
+        """
+        if self.agents.get(agent.id) is not agent:
+            return
+        del self.agents[agent.id]
+        self.grids[agent.IS_PREY].remove(agent)
+        self.scheduler.remove(agent)
+        x, y = self.positions.pop(agent.id)
+        if self.occupancy is not None:
+            self.occupancy[y, x, LAYER[agent.IS_PREY]] -= 1
+        self.counters.died(agent)
+        agent.diedAt = self.epoch
+        self.stale += 1
+        if self.stale * 2 > len(self.order):
+            # a running snapshot keeps iterating the old list
+            if self.pool is None:
+                self.order = [agent for agent in self.order if agent.diedAt is None]
+            else:
+                order = []
+                for agent in self.order:
+                    (order if agent.diedAt is None else self.pending).append(agent)
+                self.order = order
+            self.stale = 0
+
+    def pop(self, key, *default):
+        agent = self.agents.get(key)
+        if agent is None:
+            if default:
+                return default[0]
+            raise KeyError(key)
+        self.remove(agent)
+        return agent
+
+    def relocate(self, agent):
+        """
+        Updates the bucket and the occupancy of agent after it moved, does nothing if agent is dead
+        """
+        old = self.positions.get(agent.id)
+        if old is None or old == (agent.x, agent.y) or self.agents[agent.id] is not agent:
+            return
+        self.positions[agent.id] = (agent.x, agent.y)
+        if self.occupancy is not None:
+            layer = LAYER[agent.IS_PREY]
+            self.occupancy[old[1], old[0], layer] -= 1
+            self.occupancy[agent.y, agent.x, layer] += 1
+        self.grids[agent.IS_PREY].move(agent)
+
+    def reach(self, is_prey, steps):
+        """
+        :return: most cells an agent of the species is_prey can have moved in steps steps, agents moving at most one
+        cell on the steps their speed lets them act
+        :rtype: Int
+        """
+        moves = -(-steps // self.minSpeed[is_prey])
+        return moves if moves < steps else steps
+
+    def occupied(self, x, y, is_prey):
+        """
+        Checks in O(1) if an agent of the species is_prey stands on (x, y), needs an occupancy grid
+        """
+        return self.occupancy[y, x, LAYER[is_prey]] > 0
+
+    def species(self, is_prey):
+        """
+        Returns the live agents of the species is_prey, without scanning the other species
+        """
+        return self.grids[is_prey].cells.keys()
+
+    def nearby(self, x, y, radius, is_prey):
+        """
+        Yields the (key, agent) pairs of the species is_prey that may be within radius of (x, y)
+        """
+        if self.topology is None or not self.topology.wrap:
+            return self.grids[is_prey].query(x, y, radius)
+        return self.grids[is_prey].query_boxes(self.topology.windows(x, y, radius))
+
+    def grow_older(self):
+        """
+        Ages every live agent by one step, in O(1) plus the agents dying
+        :return: agents dying of age or hunger on this step, in id order, they are not removed yet
+        :rtype: List
+        """
+        return self.clock.advance()
+
+    def recycle(self):
+        """
+        Gives the dead agents removed from order to the pool, to call between two steps: the agents due on the last
+        step are not visited anymore and no snapshot is running, so nothing reads them as live agents afterwards
+        """
+        if self.pending and not self.iterating:
+            self.pool.release(self.pending)
+            self.pending = []
+
+    def snapshot(self):
+        """
+        Yields the agents alive when the iteration starts, in id order, without copying them
+        Agents removed during the iteration are still yielded, agents added during the iteration are not
+        """
+        self.epoch += 1
+        epoch = self.epoch
+        order = self.order
+        self.iterating += 1
+        try:
+            for i in range(len(order)):
+                agent = order[i]
+                if agent.diedAt is None or agent.diedAt == epoch:
+                    yield agent
+        finally:
+            self.iterating -= 1
+
+    def copy(self):
+        """
+        Returns a new registry holding the same agents with the same ids, a copy of the occupancy grid and the same
+        random generator and clock
+        """
+        occupancy = None if self.occupancy is None else self.occupancy.copy()
+        registry = AgentRegistry(occupancy, self.cellSize, self.nextId, self.rng, self.targetRefresh,
+                                 self.targetSlack, topology=self.topology)
+        registry.clock = self.clock  # the agents keep reading their age on it
+        registry.minSpeed = dict(self.minSpeed)  # the agents are not added with add, which keeps it up to date
+        for agent in self.agents.values():
+            registry.agents[agent.id] = agent
+            registry.order.append(agent)
+            registry.grids[agent.IS_PREY].insert(agent.id, agent)
+            registry.scheduler.insert(agent)
+            registry.positions[agent.id] = self.positions[agent.id]
+            registry.counters.born(agent)
+        return registry
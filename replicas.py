@@ -0,0 +1,144 @@
+"""
+Python-Ecosystem by Alexandre Sajus
+
+More information at:
+https://github.com/AlexandreSajus/PythonEcosystem
+
+replicas.py takes care of running many independent worlds of the vectorized engine as a single batch
+The herds of every world are concatenated with a replica attribute telling their world apart, so one call of
+vectorized.step advances them all: searches only look at the agents of the same world (see vectorized.nearest) and
+every random draw comes from the stream of the world of the agent. Replica r gives exactly the run of the vectorized
+engine with seeds[r], while small worlds no longer pay the interpreter overhead of a step each
+"""
+
+import numpy as np
+
+import run
+import vectorized
+
+
+class ReplicaRandom:
+    """
+    One random stream per replica, pre-drawn blockSize uniforms at a time for every replica at once
+    random(groups) hands out the next uniform of the stream of groups[i] for every i, in order, so each stream
+    sees the same sequence of draws as a NumPy Generator used by a single world
+    """
+
+    def __init__(self, generators, blockSize=1024):
+        self.generators = list(generators)
+        self.blockSize = blockSize
+        self.blocks = np.array([generator.random(blockSize) for generator in self.generators]).reshape(-1, blockSize)
+        self.cursors = np.zeros(len(self.generators), dtype=np.int64)  # uniforms already handed out of every block
+        self.filled = np.full(len(self.generators), blockSize)  # uniforms drawn in every block
+
+    def refill(self, replica):
+        """
+        Moves the uniforms of replica not handed out yet to the start of its block and completes it with new ones
+        """
+        left = self.blocks[replica, self.cursors[replica]:self.filled[replica]]
+        self.blocks[replica] = np.concatenate((left, self.generators[replica].random(self.blockSize - len(left))))
+        self.cursors[replica] = 0
+        self.filled[replica] = self.blockSize
+
+    def random(self, groups):
+        """
+        :param groups: replica of every uniform to draw
+        :type groups: Array
+        :return: uniforms in [0, 1)
+        :rtype: Array
+        """
+        groups = np.asarray(groups, dtype=np.int64)
+        counts = np.bincount(groups, minlength=len(self.generators))
+        if counts.max(initial=0) > self.blockSize:
+            # every block grows to hold the largest draw
+            blocks, self.blockSize = self.blocks, int(counts.max())
+            self.blocks = np.empty((len(self.generators), self.blockSize))
+            for replica in range(len(self.generators)):
+                self.blocks[replica, :blocks.shape[1]] = blocks[replica]
+                self.refill(replica)
+        for replica in np.flatnonzero(self.cursors + counts > self.blockSize):
+            self.refill(replica)
+        # the k-th draw of a replica takes the k-th uniform left in its block
+        order = np.argsort(groups, kind="stable")
+        sortedGroups = groups[order]
+        rank = np.arange(len(groups)) - np.repeat(np.cumsum(counts) - counts, counts)
+        uniforms = np.empty(len(groups))
+        uniforms[order] = self.blocks[sortedGroups, self.cursors[sortedGroups] + rank]
+        self.cursors += counts
+        return uniforms
+
+
+def create_replicas(params=None, seeds=(0,)):
+    """
+    Creates one world per seed and batches them
+    :param params: parameters of the worlds (see run.parameters), the default ones if None
+    :type params: Dict
+    :param seeds: seed of every world, None for a random seed
+    :type seeds: List
+    :return: state, integer array of size replicas*h*w*2 with the number of bunnies and foxes on each spot of each world
+    :rtype: Array
+    :return: world, the herds of every world and their random streams
+    :rtype: VectorWorld
+    """
+    params = params or run.parameters()
+    worlds = [vectorized.create_world(**params, seed=seed)[1] for seed in seeds]
+    herds = []
+    for species in ("bunnies", "foxes"):
+        names = getattr(worlds[0], species).names
+        fields = {name: np.concatenate([getattr(getattr(world, species), name) for world in worlds]) for name in names}
+        fields["replica"] = np.repeat(np.arange(len(worlds)), [len(getattr(world, species)) for world in worlds])
+        herds.append(vectorized.Herd(**fields))
+    first = worlds[0]
+    world = vectorized.VectorWorld(first.h, first.w, herds[0], herds[1], ReplicaRandom(w.rng for w in worlds),
+                                   first.cellSize)
+    state = np.zeros((len(worlds), world.h, world.w, 2), dtype=np.int32)
+    vectorized.count_cells(state, world)
+    return state, world
+
+
+def count(world, replicas):
+    """
+    counts living bunnies and foxes and the average bunny speed of every replica
+    :return: liveBunnies, liveFoxes, avgSpeed, one value per replica
+    :rtype: Array
+    """
+    b = world.bunnies
+    liveBunnies = np.bincount(b.replica, minlength=replicas)
+    liveFoxes = np.bincount(world.foxes.replica, minlength=replicas)
+    speedSum = np.bincount(b.replica, weights=b.speed, minlength=replicas)
+    return liveBunnies, liveFoxes, speedSum / np.maximum(liveBunnies, 0.1)
+
+
+def simulate(steps, params=None, seeds=(0,)):
+    """
+    Runs one world per seed for a number of steps, all of them in the same batch
+    Like ecosystem.simulate, the series of a world end on the step where every agent of the world is dead, and the
+    batch stops when every world is extinct
+    :param steps: number of steps
+    :type steps: Int
+    :param params: parameters of the worlds (see run.parameters), the default ones if None
+    :type params: Dict
+    :param seeds: seed of every world, None for a random seed
+    :type seeds: List
+    :return: time series t, popBunny, popFox and speed of every world, as returned by ecosystem.simulate
+    :rtype: List
+    """
+    params = params or run.parameters()
+    replicas = len(seeds)
+    state, world = create_replicas(params, seeds)
+    popBunny = np.zeros((replicas, steps), dtype=np.int64)
+    popFox = np.zeros((replicas, steps), dtype=np.int64)
+    speed = np.zeros((replicas, steps))
+    ends = np.full(replicas, steps)
+    alive = np.ones(replicas, dtype=bool)
+    for t in range(steps):
+        vectorized.step(t, state, world, params["age_fox"], params["age_fox"])
+        popBunny[:, t], popFox[:, t], speed[:, t] = count(world, replicas)
+        extinct = alive & (popBunny[:, t] == 0) & (popFox[:, t] == 0)
+        ends[extinct] = t + 1
+        alive &= ~extinct
+        if not alive.any():
+            break
+    T = np.arange(1, steps + 1)
+    return [{"t": T[:end], "popBunny": popBunny[r, :end], "popFox": popFox[r, :end], "speed": speed[r, :end]}
+            for r, end in enumerate(ends)]
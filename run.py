@@ -6,128 +6,154 @@ https://github.com/AlexandreSajus/PythonEcosystem
 """
 
 # run.py takes care of creating the world and animating it
+# matplotlib is only imported by main, so the simulation functions can be used headlessly (see ecosystem.py)
 
-from random import randint
-
-import matplotlib.animation as animation
-import matplotlib.pyplot as plt
 import numpy as np
 
+import scheduler
+import sharded
+import vectorized
 from agents import Bunny, Fox
+from counters import RingBuffer
+from pool import AgentPool
+from randomness import BatchedRandom
+from registry import AgentRegistry
+from topology import Topology
+from vectorized import VectorWorld
 
 
 def create_world(h, w, n_bunnies, speed_bunny_min, speed_bunny_max, visibility_bunny, gestChance_bunny,
                  gestStatus_bunny, gestNumber_bunny, age_bunny, n_foxes, speed_fox, visibility_fox, huntStatus_fox, age_fox,
                  hunger_fox, hungerThresMin_fox, hungerThresMax_fox, hungerReward_fox, maxHunger_fox, gestChance_fox,
-                 gestStatus_fox, gestNumber_fox):
+                 gestStatus_fox, gestNumber_fox, targetRefresh=0, targetSlack=5, wrap=False, seed=None):
     """
     Creates an initial world by generating agents with their initial parameters on a h*w 2D grid
     :param h, w: size of the world (height, width)
     :type h, w: Int
     :param parameters of the agents: explained down there
     :type parameters of the agents: Int or Float
-    :return: state, 2D array of size h*w with 0 if the spot is empty or the id of an agent if an agent is in the spot
+    :param targetRefresh, targetSlack: caching of the targets of detect_prey, explained down there
+    :type targetRefresh, targetSlack: Int
+    :param wrap: True for a toroidal world, explained down there
+    :type wrap: Bool
+    :param seed: seed of the random generator of the world, None for a random seed
+    :type seed: Int
+    :return: state, integer array of size h*w*2 with the number of bunnies (state[y, x, 0]) and foxes (state[y, x, 1]) on each spot
     :rtype: Array
-    :return: liveAgents, a dictionary with key=id_of_agent and value=agent
-    :rtype: Dict
+    :return: liveAgents, the live agents with key=id_of_agent and value=agent
+    :rtype: AgentRegistry
     """
-    state = np.zeros((h, w))
-    liveAgents = {}
-    for i in range(1, n_bunnies + 1):
-        x = randint(0, w - 1)
-        y = randint(0, h - 1)
-        state[y][x] = i
-        liveAgents[i] = Bunny(
-            x, y, randint(speed_bunny_min, speed_bunny_max), visibility_bunny, gestChance_bunny, gestStatus_bunny, gestNumber_bunny, age_bunny)
-
-    for j in range(n_bunnies + 1, n_bunnies + 1 + n_foxes):
-        x = randint(0, w - 1)
-        y = randint(0, h - 1)
-        state[y][x] = j
-        liveAgents[j] = Fox(x, y, speed_fox, visibility_fox, age_fox, huntStatus_fox,
-                            hunger_fox, hungerThresMin_fox, hungerThresMax_fox, hungerReward_fox, maxHunger_fox, gestChance_fox, gestStatus_fox, gestNumber_fox)
+    state = np.zeros((h, w, 2), dtype=np.int32)
+    rng = BatchedRandom(seed)
+    # liveAgents keeps state up to date and recycles the dead agents as newborns
+    liveAgents = AgentRegistry(state, rng=rng, targetRefresh=targetRefresh, targetSlack=targetSlack, pool=AgentPool(),
+                               topology=Topology(h, w, wrap))
+    for i in range(n_bunnies):
+        x = rng.randint(0, w - 1)
+        y = rng.randint(0, h - 1)
+        liveAgents.add(Bunny(
+            x, y, rng.randint(speed_bunny_min, speed_bunny_max), visibility_bunny, gestChance_bunny, gestStatus_bunny, gestNumber_bunny, age_bunny))
+
+    for j in range(n_foxes):
+        x = rng.randint(0, w - 1)
+        y = rng.randint(0, h - 1)
+        liveAgents.add(Fox(x, y, speed_fox, visibility_fox, age_fox, huntStatus_fox,
+                           hunger_fox, hungerThresMin_fox, hungerThresMax_fox, hungerReward_fox, maxHunger_fox, gestChance_fox, gestStatus_fox, gestNumber_fox))
 
     return state, liveAgents
 
 
 def update_state(state, liveAgents):
     """
-    updates state according to liveAgents
-    :param state: state, 2D array of size h*w with 0 if the spot is empty or the id of an agent if an agent is in the spot
+    updates state according to liveAgents. The AgentRegistry already updates it in place as agents move, are born
+    and die, so nothing is allocated or rewritten
+    :param state: state, integer array of size h*w*2 with the number of bunnies (state[y, x, 0]) and foxes (state[y, x, 1]) on each spot
     :type state: Array
-    :param: liveAgents, a dictionary with key=id_of_agent and value=agent
-    :type liveAgents: Dict
-    :return: state, 2D array of size h*w with 0 if the spot is empty or the id of an agent if an agent is in the spot
+    :param: liveAgents, the live agents with key=id_of_agent and value=agent
+    :type liveAgents: AgentRegistry
+    :return: state, integer array of size h*w*2 with the number of bunnies (state[y, x, 0]) and foxes (state[y, x, 1]) on each spot
     :rtype: Array
     """
-    state = np.zeros((len(state), len(state[0])))
-    for key, agent in liveAgents.items():
-        x = agent.x
-        y = agent.y
-        state[y][x] = key
-    return state
+    return state if liveAgents.occupancy is None else liveAgents.occupancy
 
 
-def step(t, state, liveAgents):
+def step(t, state, liveAgents, age=None):
     """
     Asks every agent to act according to their act function
     :param t: time
     :type t: Int
-    :param state: state, 2D array of size h*w with 0 if the spot is empty or the id of an agent if an agent is in the spot
+    :param state: state, integer array of size h*w*2 with the number of bunnies (state[y, x, 0]) and foxes (state[y, x, 1]) on each spot
     :type state: Array
-    :param: liveAgents, a dictionary with key=id_of_agent and value=agent
-    :type liveAgents: Dict
-    :return: state, 2D array of size h*w with 0 if the spot is empty or the id of an agent if an agent is in the spot
+    :param: liveAgents, the live agents with key=id_of_agent and value=agent
+    :type liveAgents: AgentRegistry
+    :param age: age given to the newborns, age_fox by default
+    :type age: Int
+    :return: state, integer array of size h*w*2 with the number of bunnies (state[y, x, 0]) and foxes (state[y, x, 1]) on each spot
     :rtype: Array
     """
-    for key, agent in liveAgents.copy().items():
-        agent.act(t, state, liveAgents, age_fox)
+    age = age_fox if age is None else age
+    if isinstance(liveAgents, sharded.ShardedWorld):
+        return liveAgents.step(t, age, state)
+    if isinstance(liveAgents, VectorWorld):
+        return vectorized.step(t, state, liveAgents, age, age)
+    # only the agents dying on this step or whose speed lets them act are visited, in id order as if every agent
+    # alive at the start of the step acted in turn, newborns will act on the next one
+    dying = liveAgents.grow_older()
+    agents = liveAgents.scheduler.due(t)
+    if dying:
+        agents = sorted(set(agents).union(dying), key=scheduler.ID)
+        dying = set(dying)
+    for agent in agents:
+        if agent in dying:
+            liveAgents.remove(agent)
+        if t % agent.speed == 0:
+            agent.behave(state, liveAgents, age)
+    liveAgents.recycle()
     return update_state(state, liveAgents)
 
 
 def export(liveAgents):
     """
     Exports the coordinates of the agents in lists readable by matplotlib
-    :param: liveAgents, a dictionary with key=id_of_agent and value=agent
-    :type liveAgents: Dict
+    :param: liveAgents, the live agents with key=id_of_agent and value=agent
+    :type liveAgents: AgentRegistry
     :return: XBunnies, YBunnies, XFoxes, YFoxes, list of the coordinates of the agents
     :rtype: List
     """
-    XBunnies = []
-    YBunnies = []
-    XFoxes = []
-    YFoxes = []
-    for agent in liveAgents.values():
-        if isinstance(agent, Bunny):
-            XBunnies.append(agent.x)
-            YBunnies.append(agent.y)
-        elif isinstance(agent, Fox):
-            XFoxes.append(agent.x)
-            YFoxes.append(agent.y)
+    if isinstance(liveAgents, sharded.ShardedWorld):
+        liveAgents = liveAgents.gather()
+    if isinstance(liveAgents, VectorWorld):
+        return vectorized.export(liveAgents)
+    bunnies = liveAgents.species(Bunny.IS_PREY)
+    foxes = liveAgents.species(Fox.IS_PREY)
+    XBunnies = [agent.x for agent in bunnies]
+    YBunnies = [agent.y for agent in bunnies]
+    XFoxes = [agent.x for agent in foxes]
+    YFoxes = [agent.y for agent in foxes]
     return XBunnies, YBunnies, XFoxes, YFoxes
 
 
 def count(liveAgents):
     """
     counts living bunnies and foxes and the average bunny speed (for natural selection )
-    :param: liveAgents, a dictionary with key=id_of_agent and value=agent
-    :type liveAgents: Dict
+    The counters of liveAgents are updated on every birth and death, so this is O(1)
+    :param: liveAgents, the live agents with key=id_of_agent and value=agent
+    :type liveAgents: AgentRegistry
     :return: liveBunnies, liveFoxes, avgSpeed
     :rtype: Int or Float
     """
-    liveBunnies = 0
-    liveFoxes = 0
-    speed = 0
-    for agent in liveAgents.values():
-        if isinstance(agent, Bunny):
-            liveBunnies += 1
-            speed += agent.speed
-        else:
-            liveFoxes += 1
-    return liveBunnies, liveFoxes, speed/max(liveBunnies, 0.1)
+    if isinstance(liveAgents, sharded.ShardedWorld):
+        return liveAgents.count()
+    if isinstance(liveAgents, VectorWorld):
+        return vectorized.count(liveAgents)
+    counters = liveAgents.counters
+    return counters.bunnies, counters.foxes, counters.average_speed()
 
 
 # Initialization of the variables
+# "object" simulates Bunny and Fox instances (agents.py), "vectorized" simulates NumPy arrays (vectorized.py),
+# "sharded" runs the vectorized engine on one process per tile of the world (sharded.py)
+engine = "object"
 w = 50  # width of world
 h = 50  # height of world
 n_bunnies = 100  # number of bunnies
@@ -156,99 +182,160 @@ gestChance_fox = 0.0004  # chance to want to reproduce for foxes
 # reproduction status for bunnies (0 for don't want to reproduce, 1 elsewise)
 gestStatus_fox = 0
 gestNumber_fox = 1  # foxes created per reproduction
+# steps during which an agent keeps chasing or fleeing its last target without checking that it is still the nearest
+# (0 to only keep targets that provably are, giving the same results as searching every time)
+targetRefresh = 0
+targetSlack = 5  # extra range searched around the visibility, so that a target stays provably the nearest for longer
+# False for a world whose borders stop the agents, True for a toroidal one whose borders lead to the opposite side
+# (object engine only)
+wrap = False
+
+# parameters of the world, passed by name to create_world
+WORLD_PARAMETERS = ("w", "h", "n_bunnies", "speed_bunny_min", "speed_bunny_max", "visibility_bunny", "gestChance_bunny",
+                    "gestStatus_bunny", "gestNumber_bunny", "age_bunny", "n_foxes", "speed_fox", "visibility_fox",
+                    "age_fox", "huntStatus_fox", "hunger_fox", "hungerThresMin_fox", "hungerThresMax_fox",
+                    "hungerReward_fox", "maxHunger_fox", "gestChance_fox", "gestStatus_fox", "gestNumber_fox",
+                    "targetRefresh", "targetSlack", "wrap")
+
+
+def parameters(**overrides):
+    """
+    Returns the parameters of the world defined above
+    :param overrides: parameters replacing the default ones, for example speed_fox=3
+    :type overrides: Int or Float
+    :return: parameters, a dictionary with key=name_of_parameter and value=value
+    :rtype: Dict
+    """
+    unknown = set(overrides) - set(WORLD_PARAMETERS)
+    if unknown:
+        raise ValueError("unknown parameters: " + ", ".join(sorted(unknown)))
+    return {name: overrides.get(name, globals()[name]) for name in WORLD_PARAMETERS}
 
-# Change the font size for matplotlib
-size = 8
-small_size = 6
-plt.rc('font', size=size)          # controls default text sizes
-plt.rc('axes', titlesize=size)     # fontsize of the axes title
-plt.rc('axes', labelsize=small_size)    # fontsize of the x and y labels
-plt.rc('xtick', labelsize=small_size)    # fontsize of the tick labels
-plt.rc('ytick', labelsize=small_size)    # fontsize of the tick labels
-plt.rc('legend', fontsize=small_size)    # legend fontsize
-plt.rc('figure', titlesize=small_size)
-
-# Setting up the plots
-fig = plt.figure()
-ax1 = plt.subplot(221, title="Ecosystem (blue=bunny; red=fox)",
-                  xlabel="x (-)", ylabel="y (-)")
-plt.xlim(0, w)
-plt.ylim(0, h)
-bunnies, = ax1.plot([], [], 'bo', ms=3)
-foxes, = ax1.plot([], [], 'ro', ms=3)
-
-
-# Plot to study the evolution of average speed of bunnies over time, for natural selection study
-ax2 = plt.subplot(224, title="Average speed of bunnies over time (red=fox speed)",
-                  xlabel="time (-)", ylabel="speed (less is faster) (-)")
-plt.xlim(0, 5000)
-plt.ylim(7, 2)
-plt.plot([0, 5000], [speed_fox, speed_fox], color='r')
-speedData, = ax2.plot([], [])
-
-
-ax3 = plt.subplot(222, title="Population over time",
-                  xlabel="time (-)", ylabel="population (-)")
-plt.xlim(0, 5000)
-plt.ylim(0, 200)
-popBunnyData, = ax3.plot([], [])
-popFoxData, = ax3.plot([], [], color='r')
-
-fig.tight_layout(pad=1.5)
-
-
-def init():
-    """initialize animation"""
-    bunnies.set_data([], [])
-    foxes.set_data([], [])
-    popBunnyData.set_data([], [])
-    popFoxData.set_data([], [])
-    speedData.set_data([], [])
-    return bunnies, foxes, popBunnyData, popFoxData, speedData,
-
-
-# Create a new world
-(state, liveAgents) = create_world(w, h, n_bunnies,
-                                   speed_bunny_min, speed_bunny_max, visibility_bunny, gestChance_bunny, gestStatus_bunny,
-                                   gestNumber_bunny, age_bunny, n_foxes, speed_fox, visibility_fox, age_fox, huntStatus_fox,
-                                   hunger_fox, hungerThresMin_fox, hungerThresMax_fox, hungerReward_fox, maxHunger_fox,
-                                   gestChance_fox, gestStatus_fox, gestNumber_fox)
-t = 0  # time
-T = []
-popBunnyList = []
-popFoxList = []
-speedList = []
-
-# Animation function
-
-
-def animate(_):
-    global t, state, liveAgents
-    state = step(t, state, liveAgents)  # execute a step
-    t += 1  # increment time
-    T.append(t)  # time list for matplotlib
-
-    totalCount = count(liveAgents)
-    popBunnyList.append(totalCount[0])  # update the number of live bunnies
-    popFoxList.append(totalCount[1])  # update the number of live foxes
-    speedList.append(totalCount[2])  # update the average speed of bunnies
-    # export the positions of the agents for matplotlib
-    (Xbunnies, Ybunnies, XFoxes, YFoxes) = export(liveAgents)
-
-    # Set data for animation
-    bunnies.set_data(Xbunnies, Ybunnies)
-    foxes.set_data(XFoxes, YFoxes)
-    popBunnyData.set_data(T, popBunnyList)
-    popFoxData.set_data(T, popFoxList)
-    speedData.set_data(T, speedList)
-
-    return bunnies, foxes, popBunnyData, popFoxData, speedData,
 
+def new_world(params=None, engine=None, seed=None, tiles=None):
+    """
+    Creates a new world
+    :param params: parameters of the world (see parameters), the default ones if None
+    :type params: Dict
+    :param engine: "object", "vectorized" or "sharded", the engine defined above if None
+    :type engine: String
+    :param seed: seed of the random generator of the world, None for a random seed
+    :type seed: Int
+    :param tiles: number of tiles of the sharded engine, the number of cores if None
+    :type tiles: Int
+    :return: state, liveAgents (a VectorWorld for the vectorized engine, a ShardedWorld to close for the sharded one,
+    whose state is None: see ShardedWorld.occupancy to count its agents in a grid)
+    :rtype: Array, Dict
+    """
+    params = params or parameters()
+    engine = engine or globals()["engine"]
+    if engine == "sharded":
+        return None, sharded.ShardedWorld(params, tiles, seed)
+    if engine == "vectorized":
+        return vectorized.create_world(**params, seed=seed)
+    return create_world(**params, seed=seed)
 
-if __name__ == "__main__":
+
+def make_figure(plt):
+    """
+    Sets up the matplotlib figure: positions of the agents, populations and average bunny speed over time
+    :param plt: the matplotlib.pyplot module
+    :type plt: Module
+    :return: fig, bunnies, foxes (scatter plots of the positions), popBunnyData, popFoxData, speedData (lines)
+    :rtype: Tuple
+    """
+    # Change the font size for matplotlib
+    size = 8
+    small_size = 6
+    plt.rc('font', size=size)          # controls default text sizes
+    plt.rc('axes', titlesize=size)     # fontsize of the axes title
+    plt.rc('axes', labelsize=small_size)    # fontsize of the x and y labels
+    plt.rc('xtick', labelsize=small_size)    # fontsize of the tick labels
+    plt.rc('ytick', labelsize=small_size)    # fontsize of the tick labels
+    plt.rc('legend', fontsize=small_size)    # legend fontsize
+    plt.rc('figure', titlesize=small_size)
+
+    # Setting up the plots
+    fig = plt.figure()
+    ax1 = plt.subplot(221, title="Ecosystem (blue=bunny; red=fox)",
+                      xlabel="x (-)", ylabel="y (-)")
+    plt.xlim(0, w)
+    plt.ylim(0, h)
+    bunnies = ax1.scatter(np.empty(0), np.empty(0), s=9, c='b')
+    foxes = ax1.scatter(np.empty(0), np.empty(0), s=9, c='r')
+
+    # Plot to study the evolution of average speed of bunnies over time, for natural selection study
+    ax2 = plt.subplot(224, title="Average speed of bunnies over time (red=fox speed)",
+                      xlabel="time (-)", ylabel="speed (less is faster) (-)")
+    plt.xlim(0, 5000)
+    plt.ylim(7, 2)
+    plt.plot([0, 5000], [speed_fox, speed_fox], color='r')
+    speedData, = ax2.plot([], [])
+
+    ax3 = plt.subplot(222, title="Population over time",
+                      xlabel="time (-)", ylabel="population (-)")
+    plt.xlim(0, 5000)
+    plt.ylim(0, 200)
+    popBunnyData, = ax3.plot([], [])
+    popFoxData, = ax3.plot([], [], color='r')
+
+    fig.tight_layout(pad=1.5)
+    return fig, bunnies, foxes, popBunnyData, popFoxData, speedData
+
+
+def main(frames=600, interval=5):
+    """
+    Animates a new world with matplotlib, one step per frame (see viewer.py to simulate at full speed)
+    :param frames: number of steps to animate
+    :type frames: Int
+    :param interval: delay between frames in milliseconds
+    :type interval: Int
+    """
+    import matplotlib.animation as animation
+    import matplotlib.pyplot as plt
+
+    fig, bunnies, foxes, popBunnyData, popFoxData, speedData = make_figure(plt)
+
+    def init():
+        """initialize animation"""
+        bunnies.set_offsets(np.empty((0, 2)))
+        foxes.set_offsets(np.empty((0, 2)))
+        popBunnyData.set_data([], [])
+        popFoxData.set_data([], [])
+        speedData.set_data([], [])
+        return bunnies, foxes, popBunnyData, popFoxData, speedData,
+
+    # Create a new world
+    (state, liveAgents) = new_world()
+    t = 0  # time
+    # the last 5000 values of time, live bunnies, live foxes and average bunny speed
+    series = RingBuffer(("T", "popBunny", "popFox", "speed"), capacity=5000)
+
+    # Animation function
+    def animate(_):
+        nonlocal t, state
+        state = step(t, state, liveAgents)  # execute a step
+        t += 1  # increment time
+        series.append(t, *count(liveAgents))  # update the populations and the average speed of bunnies
+        # export the positions of the agents for matplotlib
+        (Xbunnies, Ybunnies, XFoxes, YFoxes) = export(liveAgents)
+
+        # Set data for animation
+        bunnies.set_offsets(np.column_stack((Xbunnies, Ybunnies)))
+        foxes.set_offsets(np.column_stack((XFoxes, YFoxes)))
+        popBunnyData.set_data(series["T"], series["popBunny"])
+        popFoxData.set_data(series["T"], series["popFox"])
+        speedData.set_data(series["T"], series["speed"])
+
+        return bunnies, foxes, popBunnyData, popFoxData, speedData,
 
     # Animation
-    ani = animation.FuncAnimation(fig, animate, frames=600,
-                                  interval=5, blit=True, init_func=init)
+    ani = animation.FuncAnimation(fig, animate, frames=frames,
+                                  interval=interval, blit=True, init_func=init)
 
     plt.show()
+    return ani
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Python-Ecosystem by Alexandre Sajus
+
+More information at:
+https://github.com/AlexandreSajus/PythonEcosystem
+
+scheduler.py takes care of finding the agents whose turn it is to act or to die, without visiting the other ones
+"""
+
+import heapq
+import itertools
+import operator
+
+ID = operator.attrgetter("id")
+
+
+class Scheduler:
+    """
+    Timing wheel of the agents: an agent acts on the steps t where t % speed == 0, so the agents are bucketed by speed
+    (every agent of a speed shares the same phase) and a step only visits the buckets of the speeds dividing it
+    Buckets are dictionaries id -> agent, they keep the agents in id order as ids increase with the date of birth
+    """
+
+    def __init__(self):
+        self.buckets = {}  # speed -> {id: agent}
+
+    def __len__(self):
+        return sum(len(bucket) for bucket in self.buckets.values())
+
+    def insert(self, agent):
+        self.buckets.setdefault(agent.speed, {})[agent.id] = agent
+
+    def remove(self, agent):
+        bucket = self.buckets.get(agent.speed)
+        if bucket is not None and bucket.pop(agent.id, None) is not None and not bucket:
+            del self.buckets[agent.speed]
+
+    def due(self, t):
+        """
+        :return: agents acting on step t, in id order. Agents added or removed afterwards do not change the list
+        :rtype: List
+        """
+        due = [list(bucket.values()) for speed, bucket in self.buckets.items() if t % speed == 0]
+        if len(due) == 1:
+            return due[0]
+        return list(heapq.merge(*due, key=ID))
+
+
+class Clock:
+    """
+    Clock of the agents that are not in a registry yet: it never moves and schedules nothing
+    The age and hunger of an agent are stored as the steps on which they reach 0, read against the clock of the agent
+    """
+
+    def __init__(self, now=0):
+        self.now = now  # number of steps aged so far
+
+    def schedule(self, expiry, agent):
+        pass
+
+
+class ExpiryQueue(Clock):
+    """
+    Clock of a registry, keeping its agents in a heap keyed by the step on which they die of age or hunger
+    Aging every agent by one step is then a single increment and only the agents actually dying are visited
+    Entries are never removed: when the expiry of an agent changes (a fox eating) a new entry is pushed and the old one
+    is skipped when it comes out
+    """
+
+    def __init__(self, now=0):
+        super(ExpiryQueue, self).__init__(now)
+        self.heap = []  # (expiry, id, tie, agent)
+        self.tie = itertools.count()  # agents are never compared, even if they have two entries for the same step
+
+    def __len__(self):
+        return len(self.heap)
+
+    def schedule(self, expiry, agent):
+        """
+        Schedules the death of agent on step expiry, values that already went by never reach 0 and are ignored
+        """
+        if expiry > self.now:
+            heapq.heappush(self.heap, (expiry, agent.id, next(self.tie), agent))
+
+    def advance(self):
+        """
+        Moves the clock one step forward
+        :return: live agents dying on this step, in id order
+        :rtype: List
+        """
+        self.now += 1
+        now = self.now
+        heap = self.heap
+        dying = []
+        while heap and heap[0][0] <= now:
+            expiry, id, tie, agent = heapq.heappop(heap)
+            # the entry may be left by a dead agent, possibly recycled since as a newborn with another id
+            if expiry == now and agent.id == id and agent.diedAt is None and agent.dies_on(now) and (
+                    not dying or dying[-1] is not agent):
+                dying.append(agent)
+        return dying
@@ -0,0 +1,349 @@
+"""
+Python-Ecosystem by Alexandre Sajus
+
+More information at:
+https://github.com/AlexandreSajus/PythonEcosystem
+
+sharded.py runs the vectorized engine on several cores by cutting the world into horizontal tiles, one per process
+Every tile owns the agents standing in its rows and publishes them in shared memory at the end of each step. On the next
+step a tile reads the agents published by its neighbours: the ones now standing in its rows are its own (migration),
+the ones within the largest visibility of its rows are ghosts (halo), seen by its agents but never acting
+A fox eating a ghost reports it, and the tile owning the bunny removes it before publishing, so the world agrees on
+births and deaths between two steps. Unlike vectorized.py, a bunny caught on the same step by foxes of two tiles feeds
+both of them, and the agents of a tile see those of its neighbours where they stood at the end of the previous step
+A tile holding more agents than the shared buffers keeps them, and the world moves to larger buffers before the next
+step (see ShardedWorld.grow)
+"""
+
+import multiprocessing
+import os
+import threading
+import traceback
+
+import numpy as np
+
+import vectorized
+
+BUNNY_FIELDS = ("x", "y", "speed", "visibility", "gestChance", "gestStatus", "gestNumber", "age")
+FOX_FIELDS = BUNNY_FIELDS + ("huntStatus", "hunger", "hungerThresMin", "hungerThresMax", "hungerReward", "maxHunger")
+# slot is the position of the agent in the buffers at the start of the step (tile * capacity + index)
+RECORDS = {name: np.dtype([(field, float if field == "gestChance" else np.int64) for field in fields + ("slot",)])
+           for name, fields in (("bunnies", BUNNY_FIELDS), ("foxes", FOX_FIELDS))}
+GO, STOP, GROW = 1, 0, 2
+
+
+class Tiles:
+    """
+    Arrays shared by the processes, each a view on a RawArray so that they can be handed to the workers
+    agents[species][tile, :counts[species][tile]] are the agents published by tile, kills[tile, :killCounts[tile]] the
+    slots of the ghosts its foxes ate, stats[tile] its bunnies, foxes and sum of bunny speeds, overflow[tile] the
+    agents of a species it could not publish (0 if it published them) and control the command, time and newborn age of
+    the step
+    """
+
+    def __init__(self, tiles, capacity, raw=None):
+        self.tiles = tiles
+        self.capacity = capacity
+        shapes = {"control": ((3,), np.int64), "stats": ((tiles, 3), float), "killCounts": ((tiles,), np.int64),
+                  "kills": ((tiles, capacity), np.int64), "overflow": ((tiles,), np.int64)}
+        for species, dtype in RECORDS.items():
+            shapes[species] = ((tiles, capacity), dtype)
+            shapes[species + "Counts"] = ((tiles,), np.int64)
+        if raw is None:
+            raw = {name: multiprocessing.RawArray("b", int(np.prod(shape)) * np.dtype(dtype).itemsize)
+                   for name, (shape, dtype) in shapes.items()}
+        self.raw = raw
+        for name, (shape, dtype) in shapes.items():
+            setattr(self, name, np.frombuffer(raw[name], dtype=dtype).reshape(shape))
+
+    def publish(self, tile, species, herd):
+        """
+        Writes the agents of herd as the agents of tile
+        """
+        if len(herd) > self.capacity:
+            raise RuntimeError("tile %d holds %d %s, more than the capacity %d" % (tile, len(herd), species,
+                                                                                  self.capacity))
+        records = getattr(self, species)[tile, :len(herd)]
+        for name in records.dtype.names:
+            records[name] = getattr(herd, name)
+        getattr(self, species + "Counts")[tile] = len(herd)
+
+    def read(self, tiles, species):
+        """
+        :return: agents published by the tiles, their slot is set to their position in the buffers
+        :rtype: Herd
+        """
+        buffers = getattr(self, species)
+        counts = getattr(self, species + "Counts")
+        records = np.concatenate([buffers[tile, :counts[tile]] for tile in tiles])
+        records["slot"] = np.concatenate([tile * self.capacity + np.arange(counts[tile]) for tile in tiles])
+        return vectorized.Herd(**{name: records[name] for name in records.dtype.names})
+
+
+def rows(tile, tiles, h):
+    """
+    :return: first and last (excluded) rows of tile
+    :rtype: Int, Int
+    """
+    return tile * h // tiles, (tile + 1) * h // tiles
+
+
+def keep_rows(herd, low, high):
+    herd.keep((low <= herd.y) & (herd.y < high))
+
+
+def worker(tile, tiles, raw, capacity, h, w, halo, cellSize, seed, start, middle, end, errors, results):
+    """
+    Simulates the agents of one tile, one step every time the parent passes the start barrier
+    On GROW, puts in results the state of its random generator and the agents it could not publish, and stops
+    :param seed: SeedSequence of the random generator, or the state of the generator of a previous worker of the tile
+    """
+    try:
+        shared = Tiles(tiles, capacity, raw)
+        rng = np.random.default_rng()
+        if isinstance(seed, dict):
+            rng.bit_generator.state = seed
+        else:
+            rng = np.random.default_rng(seed)
+        pending = None  # fields of the agents of every species when they do not fit in the buffers
+        top, bottom = rows(tile, tiles, h)
+        # rows simulated by the tile: its own rows, the halo and the row its agents can step into
+        low, high = max(0, top - halo - 1), min(h, bottom + halo + 1)
+        # tiles whose published agents, which moved at most one row out of their tile, may stand in low..high
+        sources = [other for other in range(tiles) if rows(other, tiles, h)[0] - 1 < high
+                   and low < rows(other, tiles, h)[1] + 1]
+        while True:
+            start.wait()
+            command, t, age = shared.control
+            if command == STOP:
+                return
+            if command == GROW:
+                results.put((tile, rng.bit_generator.state, pending))
+                return
+            herds = {}
+            for species in RECORDS:
+                herd = shared.read(sources, species)
+                keep_rows(herd, low, high)
+                herd.ghost = ((herd.y < top) | (herd.y >= bottom)).astype(np.int64)
+                herd.names += ("ghost",)
+                herd.y -= low  # the tile simulates rows low..high as rows 0..high-low
+                herds[species] = herd
+            world = vectorized.VectorWorld(high - low, w, herds["bunnies"], herds["foxes"], rng, cellSize)
+            b, f = world.bunnies, world.foxes
+            vectorized.age_herds(world)
+            n = len(b)
+            vectorized.bunnies_act(t, world, age)
+            b.slot[n:] = -1  # newborns are not in the buffers yet
+            ghosts = b.slot[b.ghost == 1]
+            n = len(f)
+            vectorized.foxes_act(t, world, age)
+            f.slot[n:] = -1
+            eaten = np.setdiff1d(ghosts, b.slot)  # ghosts eaten by the foxes of the tile
+            shared.kills[tile, :len(eaten)] = eaten
+            shared.killCounts[tile] = len(eaten)
+            middle.wait()
+            # bunnies of the tile eaten by the foxes of the neighbours
+            eaten = np.concatenate([shared.kills[other, :shared.killCounts[other]] for other in sources])
+            b.keep(~np.isin(b.slot, eaten))
+            for herd in (b, f):
+                herd.keep(herd.ghost == 0)
+                herd.y += low
+            if max(len(b), len(f)) > capacity:
+                shared.overflow[tile] = max(len(b), len(f))
+                pending = {species: {name: getattr(herd, name) for name in RECORDS[species].names}
+                           for species, herd in (("bunnies", b), ("foxes", f))}
+            else:
+                for species, herd in (("bunnies", b), ("foxes", f)):
+                    shared.publish(tile, species, herd)
+            shared.stats[tile] = len(b), len(f), b.speed.sum()
+            end.wait()
+    except Exception:
+        errors.put(traceback.format_exc())
+        for barrier in (start, middle, end):
+            barrier.abort()
+
+
+class ShardedWorld:
+    """
+    World of the vectorized engine simulated by one process per tile, created from the same parameters
+    Use it as a context manager, or call close, to stop the processes
+    """
+
+    def __init__(self, params, tiles=None, seed=None, capacity=None, cellSize=4):
+        """
+        :param params: parameters of the world (see run.parameters)
+        :type params: Dict
+        :param tiles: number of tiles and processes, the number of cores by default
+        :type tiles: Int
+        :param seed: seed of the random generators, None for a random seed
+        :type seed: Int
+        :param capacity: agents of one species a tile can hold before the buffers grow (see grow), 4 times the initial
+        population and at least 1024 by default
+        :type capacity: Int
+        :param cellSize: side of the cells used to search neighbours (see vectorized.nearest)
+        :type cellSize: Int
+        """
+        # the worlds on one and on several processes start from the same agents, and have the same shape
+        _, world = vectorized.create_world(**params, seed=seed, grid=False)
+        self.h, self.w = world.h, world.w
+        self.tiles = min(tiles or os.cpu_count() or 1, self.h)
+        population = len(world.bunnies) + len(world.foxes)
+        self.capacity = max(capacity or max(1024, 4 * population), population)
+        self.shared = Tiles(self.tiles, self.capacity)
+        self.written = None  # state last written by occupancy and the agents counted in it
+        for species in RECORDS:
+            herd = getattr(world, species)
+            herd.slot = np.zeros(len(herd), dtype=np.int64)
+            herd.names += ("slot",)
+            for tile in range(self.tiles):
+                part = vectorized.Herd(**{name: getattr(herd, name) for name in herd.names})
+                keep_rows(part, *rows(tile, self.tiles, self.h))
+                self.shared.publish(tile, species, part)
+        for tile in range(self.tiles):
+            b, f = (self.shared.read([tile], species) for species in RECORDS)
+            self.shared.stats[tile] = len(b), len(f), b.speed.sum()
+        self.halo = max(params["visibility_bunny"], params["visibility_fox"])
+        self.cellSize = cellSize
+        context = multiprocessing.get_context()
+        self.start = context.Barrier(self.tiles + 1)
+        self.middle = context.Barrier(self.tiles)
+        self.end = context.Barrier(self.tiles + 1)
+        self.errors = context.Queue()
+        self.results = context.Queue()
+        self.processes = []
+        self.spawn(np.random.SeedSequence(seed).spawn(self.tiles))
+
+    def spawn(self, seeds):
+        """
+        Starts one process per tile on the current buffers
+        :param seeds: seed of the random generator of every tile (see worker)
+        :type seeds: List
+        """
+        context = multiprocessing.get_context()
+        self.processes = [context.Process(target=worker, daemon=True, args=(
+            tile, self.tiles, self.shared.raw, self.capacity, self.h, self.w, self.halo, self.cellSize, seeds[tile],
+            self.start, self.middle, self.end, self.errors, self.results)) for tile in range(self.tiles)]
+        for process in self.processes:
+            process.start()
+
+    def grow(self):
+        """
+        Moves the world to buffers of twice the capacity, or more if a tile needs it. The buffers can only be handed
+        to new processes, so the workers stop and give back their random generators and the agents they could not
+        publish, and new workers continue the same run on the new buffers
+        """
+        self.shared.control[0] = GROW
+        try:
+            self.start.wait()
+        except threading.BrokenBarrierError:
+            raise RuntimeError("a tile failed:\n" + self.errors.get(timeout=10)) from None
+        results = dict((tile, (state, pending)) for tile, state, pending in (
+            self.results.get(timeout=60) for _ in self.processes))
+        for process in self.processes:
+            process.join()
+        capacity = max(2 * self.capacity, 2 * int(self.shared.overflow.max()))
+        shared = Tiles(self.tiles, capacity)
+        shared.stats[:] = self.shared.stats
+        for tile in range(self.tiles):
+            pending = results[tile][1]
+            for species in RECORDS:
+                if pending is None:
+                    herd = self.shared.read([tile], species)
+                else:
+                    herd = vectorized.Herd(**pending[species])
+                shared.publish(tile, species, herd)
+        self.shared, self.capacity = shared, capacity
+        self.spawn([results[tile][0] for tile in range(self.tiles)])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def step(self, t, age, state=None):
+        """
+        Advances every tile by one step
+        :param t: time
+        :type t: Int
+        :param age: age of the newborns
+        :type age: Int
+        :param state: integer array of size h*w*2 receiving the number of bunnies and foxes on each spot, None to skip it
+        (counting them costs the parent a pass over every agent, see occupancy)
+        :type state: Array
+        :return: state
+        :rtype: Array
+        """
+        self.shared.control[:] = GO, t, age
+        try:
+            self.start.wait()
+            self.end.wait()
+        except threading.BrokenBarrierError:
+            raise RuntimeError("a tile failed:\n" + self.errors.get(timeout=10)) from None
+        if self.shared.overflow.any():
+            self.grow()
+        if state is not None:
+            self.occupancy(state)
+        return state
+
+    def cells(self):
+        """
+        :return: flat index in a h*w*2 state of the spot and species of every agent
+        :rtype: Array
+        """
+        indices = []
+        for layer, species in enumerate(RECORDS):
+            buffers, counts = getattr(self.shared, species), getattr(self.shared, species + "Counts")
+            for tile in range(self.tiles):
+                records = buffers[tile, :counts[tile]]
+                indices.append((records["y"] * self.w + records["x"]) * 2 + layer)
+        return np.concatenate(indices)
+
+    def occupancy(self, state):
+        """
+        Writes in state the number of bunnies and foxes on each spot
+        When state is the array of the last call, only the spots of the agents counted then and now are updated, so
+        the cost follows the number of agents and not the size of the world
+        :param state: integer array of size h*w*2
+        :type state: Array
+        """
+        cells = self.cells()
+        flat = state.reshape(-1)
+        if self.written is not None and self.written[0] is state:
+            np.subtract.at(flat, self.written[1], 1)
+        else:
+            state[:] = 0
+        np.add.at(flat, cells, 1)
+        self.written = state, cells
+
+    def close(self):
+        if not self.processes:
+            return
+        self.shared.control[0] = STOP
+        try:
+            self.start.wait(timeout=10)
+        except threading.BrokenBarrierError:
+            pass
+        for process in self.processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+        self.processes = []
+
+    def gather(self):
+        """
+        :return: every agent of the world as a VectorWorld (without random generator), ordered by tile
+        :rtype: VectorWorld
+        """
+        herds = [self.shared.read(range(self.tiles), species) for species in RECORDS]
+        for herd in herds:
+            herd.names = herd.names[:-1]  # drop slot
+        return vectorized.VectorWorld(self.h, self.w, herds[0], herds[1], None)
+
+    def count(self):
+        """
+        :return: liveBunnies, liveFoxes, avgSpeed, read from the statistics of the tiles
+        :rtype: Int or Float
+        """
+        bunnies, foxes, speedSum = self.shared.stats.sum(axis=0)
+        return int(bunnies), int(foxes), float(speedSum) / max(bunnies, 0.1)
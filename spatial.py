@@ -0,0 +1,92 @@
+"""
+Python-Ecosystem by Alexandre Sajus
+
+More information at:
+https://github.com/AlexandreSajus/PythonEcosystem
+
+spatial.py takes care of indexing the agents by position so that neighbours can be found without scanning every agent
+"""
+
+
+class SpatialGrid:
+    """
+    Uniform bucket grid: the world is cut into square cells of side cellSize and every cell keeps the agents standing in it
+    """
+
+    def __init__(self, cellSize=10):
+        self.cellSize = cellSize
+        self.buckets = {}  # (cx, cy) -> {agent: key}
+        self.cells = {}  # agent -> (cx, cy)
+
+    def cell(self, x, y):
+        return x // self.cellSize, y // self.cellSize
+
+    def insert(self, key, agent):
+        cell = self.cell(agent.x, agent.y)
+        self.cells[agent] = cell
+        self.buckets.setdefault(cell, {})[agent] = key
+
+    def remove(self, agent):
+        cell = self.cells.pop(agent, None)
+        if cell is not None:
+            bucket = self.buckets[cell]
+            key = bucket.pop(agent)
+            if not bucket:
+                del self.buckets[cell]
+            return key
+
+    def move(self, agent):
+        """
+        Moves agent to the bucket matching its current position, does nothing if agent is not indexed
+        """
+        old = self.cells.get(agent)
+        if old is None:
+            return
+        cell = self.cell(agent.x, agent.y)
+        if cell != old:
+            self.insert(self.remove(agent), agent)
+
+    def query(self, x, y, radius):
+        """
+        Yields the (key, agent) pairs in every bucket intersecting the square of half side radius around (x, y)
+        :param x, y: center of the query
+        :type x, y: Int
+        :param radius: half side of the square, usually the visibility of an agent
+        :type radius: Int or Float
+        """
+        return self.box(x - radius, y - radius, x + radius, y + radius)
+
+    def query_boxes(self, boxes):
+        """
+        Yields once the (key, agent) pairs in every bucket intersecting one of the boxes (xMin, yMin, xMax, yMax), for
+        example the windows of a square crossing the borders of a toroidal world (see Topology.windows)
+        """
+        if len(boxes) == 1:
+            yield from self.box(*boxes[0])
+            return
+        seen = set()
+        for box in boxes:
+            for key, agent in self.box(*box):
+                if key not in seen:
+                    seen.add(key)
+                    yield key, agent
+
+    def box(self, xMin, yMin, xMax, yMax):
+        """
+        Yields the (key, agent) pairs in every bucket intersecting the box
+        """
+        cxMin, cyMin = self.cell(xMin, yMin)
+        cxMax, cyMax = self.cell(xMax, yMax)
+        if (cxMax - cxMin + 1) * (cyMax - cyMin + 1) > len(self.buckets):
+            # the square covers more cells than there are occupied buckets, filter the buckets instead
+            for (cx, cy), bucket in self.buckets.items():
+                if cxMin <= cx <= cxMax and cyMin <= cy <= cyMax:
+                    for agent, key in bucket.items():
+                        yield key, agent
+        else:
+            for cx in range(int(cxMin), int(cxMax) + 1):
+                for cy in range(int(cyMin), int(cyMax) + 1):
+                    bucket = self.buckets.get((cx, cy))
+                    if bucket:
+                        for agent, key in bucket.items():
+                            yield key, agent
@@ -0,0 +1,127 @@
+"""
+Python-Ecosystem by Alexandre Sajus
+
+More information at:
+https://github.com/AlexandreSajus/PythonEcosystem
+
+sweep.py runs every combination of a grid of parameters for several seeds on a pool of processes
+Every run is summarized (extinction times, population statistics, final bunny speed) in one CSV file
+    python -m ecosystem sweep --grid grid.json --seeds 0 1 2 3 --steps 20000 --out sweep.csv
+"""
+
+import csv
+import itertools
+import multiprocessing
+
+import numpy as np
+
+import ecosystem
+import replicas
+import run
+
+SUMMARY_FIELDS = ("steps", "extinctionBunny", "extinctionFox", "meanBunny", "varBunny", "meanFox", "varFox",
+                  "finalSpeed")
+
+
+def expand_grid(grid):
+    """
+    Lists every combination of a grid of parameters
+    :param grid: dictionary with key=name_of_parameter and value=list of values, for example {"speed_fox": [3, 4]}
+    :type grid: Dict
+    :return: list of dictionaries with key=name_of_parameter and value=value
+    :rtype: List
+    """
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def summarize(series):
+    """
+    Summarizes the time series returned by ecosystem.simulate
+    :return: dictionary with the keys of SUMMARY_FIELDS, extinction times are None if the species survived
+    :rtype: Dict
+    """
+    popBunny, popFox = series["popBunny"], series["popFox"]
+    extinctBunny = np.flatnonzero(popBunny == 0)
+    extinctFox = np.flatnonzero(popFox == 0)
+    return {
+        "steps": len(popBunny),
+        "extinctionBunny": int(series["t"][extinctBunny[0]]) if len(extinctBunny) else None,
+        "extinctionFox": int(series["t"][extinctFox[0]]) if len(extinctFox) else None,
+        "meanBunny": float(popBunny.mean()),
+        "varBunny": float(popBunny.var()),
+        "meanFox": float(popFox.mean()),
+        "varFox": float(popFox.var()),
+        "finalSpeed": float(series["speed"][-1]),
+    }
+
+
+def run_one(task):
+    """
+    Worker of the pool: simulates one combination of parameters for one seed
+    :param task: (overrides, seed, steps, engine)
+    :type task: Tuple
+    :return: overrides, seed and summary merged in one dictionary
+    :rtype: Dict
+    """
+    overrides, seed, steps, engine = task
+    series = ecosystem.simulate(steps, run.parameters(**overrides), engine, seed)
+    return dict(overrides, seed=seed, **summarize(series))
+
+
+def run_replicas(task):
+    """
+    Worker of the pool: simulates one combination of parameters for every seed in a single batch (see replicas.py)
+    :param task: (overrides, seeds, steps)
+    :type task: Tuple
+    :return: one dictionary per seed, overrides, seed and summary merged
+    :rtype: List
+    """
+    overrides, seeds, steps = task
+    batch = replicas.simulate(steps, run.parameters(**overrides), seeds)
+    return [dict(overrides, seed=seed, **summarize(series)) for seed, series in zip(seeds, batch)]
+
+
+def sweep(grid, seeds, steps, engine=None, processes=None, out=None):
+    """
+    Simulates every combination of grid for every seed, using every core by default
+    Results are written to out as soon as each run finishes. With the "replicas" engine, the seeds of a combination are
+    simulated together as one batch of the vectorized engine, giving the same results as "vectorized"
+    :param grid: dictionary with key=name_of_parameter and value=list of values
+    :type grid: Dict
+    :param seeds: seeds of the runs of each combination
+    :type seeds: List
+    :param steps: number of steps of each run
+    :type steps: Int
+    :param processes: size of the pool, the number of cores if None
+    :type processes: Int
+    :param out: path of the CSV file of results, None to only return them
+    :type out: String
+    :return: results, one dictionary per run in completion order
+    :rtype: List
+    """
+    combinations = expand_grid(grid)
+    run.parameters(**combinations[0])  # check the names of the parameters before starting the pool
+    if engine == "replicas":
+        worker, tasks = run_replicas, [(overrides, list(seeds), steps) for overrides in combinations]
+    else:
+        worker, tasks = run_one, [(overrides, seed, steps, engine) for overrides in combinations for seed in seeds]
+    fields = list(grid) + ["seed"] + list(SUMMARY_FIELDS)
+    results = []
+    file = open(out, "w", newline="") if out else None
+    try:
+        writer = csv.DictWriter(file, fieldnames=fields) if file else None
+        if writer:
+            writer.writeheader()
+        with multiprocessing.Pool(processes) as pool:
+            for done in pool.imap_unordered(worker, tasks):
+                for result in done if isinstance(done, list) else [done]:
+                    results.append(result)
+                    if writer:
+                        writer.writerow(result)
+                if writer:
+                    file.flush()
+    finally:
+        if file:
+            file.close()
+    return results
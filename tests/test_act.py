@@ -1,10 +1,12 @@
 import run
 
+state, liveAgents = run.new_world()
+
 
 def test_bunny_act():
     # Test
-    l_a = run.liveAgents.copy()
-    l_a[1].act(0, run.state, l_a, run.age_fox)
+    l_a = liveAgents.copy()
+    l_a[1].act(0, state, l_a, run.age_fox)
 
 
 if __name__ == "__main__":
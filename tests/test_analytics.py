@@ -0,0 +1,58 @@
+import numpy as np
+
+import analytics
+import ecosystem
+import run
+
+
+def full_pass(liveAgents):
+    bunnies, foxes = list(liveAgents.species(True)), list(liveAgents.species(False))
+    return {"speedBunny": [agent.speed for agent in bunnies], "hungerFox": [agent.hunger for agent in foxes],
+            "ageBunny": [agent.age for agent in bunnies if agent.age > 0],
+            "ageFox": [agent.age for agent in foxes if agent.age > 0]}
+
+
+def test_incremental_histograms_match_full_pass():
+    # Test
+    params = run.parameters(n_foxes=12, gestChance_fox=0.01)
+    state, liveAgents = run.new_world(params, seed=3)
+    for t in range(1500):
+        state = run.step(t, state, liveAgents, params["age_fox"])
+        if t % 300 == 0:
+            values = analytics.trait_values(liveAgents)
+            # Verify
+            for trait, expected in full_pass(liveAgents).items():
+                assert sorted(np.repeat(*values[trait]).tolist()) == sorted(expected)
+
+
+def test_distribution_merges_batches():
+    # Test
+    rng = np.random.default_rng(0)
+    batches = [rng.integers(0, 100, 50) for _ in range(5)]
+    distribution = analytics.Distribution(np.linspace(0, 100, 11))
+    for batch in batches:
+        distribution.add(batch, np.ones(len(batch), dtype=np.int64))
+    values = np.concatenate(batches)
+    # Verify
+    assert distribution.n == len(values)
+    assert np.isclose(distribution.mean, values.mean()) and np.isclose(distribution.variance(), values.var())
+    assert distribution.counts.tolist() == np.histogram(values, np.linspace(0, 100, 11))[0].tolist()
+    assert abs(distribution.quantile(0.5) - np.median(values)) <= 10
+
+
+def test_sampler_writes_every_k_ticks(tmp_path):
+    for engine in ("object", "vectorized"):
+        # Test
+        path = tmp_path / ("%s.jsonl" % engine)
+        params = run.parameters()
+        with analytics.TraitSampler(params, every=50, out=str(path)) as sampler:
+            series = ecosystem.simulate(200, params, engine, seed=1, traits=sampler)
+        edges, samples = analytics.read(path)
+        # Verify
+        assert [sample["t"] for sample in samples] == [50, 100, 150, 200]
+        assert [sample["speedBunny"]["n"] for sample in samples] == series["popBunny"][49::50].tolist()
+        assert len(samples[0]["ageBunny"]["hist"]) == len(edges["ageBunny"]) - 1
+        summary = sampler.summary()
+        assert summary["speedBunny"]["n"] == sum(sample["speedBunny"]["n"] for sample in samples)
+        assert np.isclose(summary["speedBunny"]["mean"] * summary["speedBunny"]["n"],
+                          sum(sample["speedBunny"]["mean"] * sample["speedBunny"]["n"] for sample in samples))
@@ -0,0 +1,48 @@
+import numpy as np
+
+import checkpoint
+import ecosystem
+import run
+
+
+def test_resumed_run_matches_uninterrupted_run(tmp_path):
+    for engine in ("object", "vectorized"):
+        # Test
+        path = tmp_path / ("%s.npz" % engine)
+        full = ecosystem.simulate(300, engine=engine, seed=4)
+        ecosystem.simulate(120, engine=engine, seed=4, checkpointPath=str(path), checkpointEvery=100)
+        resumed = ecosystem.simulate(300, resume=str(path))
+        # Verify
+        for name in full:
+            assert np.array_equal(full[name], resumed[name])
+
+
+def test_resumed_run_with_target_refresh_matches_uninterrupted_run(tmp_path):
+    # Test
+    params = run.parameters(targetRefresh=8)
+    path = tmp_path / "world.npz"
+    full = ecosystem.simulate(400, params, seed=2)
+    ecosystem.simulate(200, params, seed=2, checkpointPath=str(path), checkpointEvery=200)
+    resumed = ecosystem.simulate(400, resume=str(path))
+    # Verify
+    for name in full:
+        assert np.array_equal(full[name], resumed[name])
+
+
+def test_restored_world_matches_saved_world(tmp_path):
+    # Test
+    state, liveAgents = run.new_world(seed=1)
+    for t in range(50):
+        state = run.step(t, state, liveAgents, run.age_fox)
+    checkpoint.save(tmp_path / "world.npz", 50, state, liveAgents)
+    t, restoredState, restored, series, params = checkpoint.load(tmp_path / "world.npz")
+    # Verify
+    assert t == 50 and series is None and params is None
+    assert np.array_equal(state, restoredState)
+    assert restored.nextId == liveAgents.nextId
+    assert restored.rng.getstate() == liveAgents.rng.getstate()
+    assert [(key, type(agent), agent.x, agent.y, agent.age) for key, agent in sorted(restored.items())] == \
+        [(key, type(agent), agent.x, agent.y, agent.age) for key, agent in sorted(liveAgents.items())]
+    assert restored.minSpeed == liveAgents.minSpeed
+    assert [checkpoint.target_fields(agent, restored.clock.now) for key, agent in sorted(restored.items())] == \
+        [checkpoint.target_fields(agent, liveAgents.clock.now) for key, agent in sorted(liveAgents.items())]
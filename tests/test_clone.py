@@ -0,0 +1,18 @@
+import benchmarks
+
+
+def test_fox_clone_copies_parent_with_new_age():
+    # Test
+    parent = benchmarks.new_fox()
+    parent.hunger = 123
+    newborn = parent.clone(42)
+    # Verify
+    assert newborn is not parent
+    assert newborn.age == 42
+    assert (newborn.hunger, newborn.visibility, newborn.gestNumber) == (123, parent.visibility, parent.gestNumber)
+
+
+def test_agents_have_no_dict():
+    # Verify
+    assert not hasattr(benchmarks.new_bunny(), "__dict__")
+    assert not hasattr(benchmarks.new_fox(), "__dict__")
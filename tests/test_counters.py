@@ -0,0 +1,47 @@
+import numpy as np
+
+import run
+from counters import RingBuffer, TimeSeries
+
+
+def test_counters_match_full_count():
+    # Test
+    state, liveAgents = run.new_world()
+    for t in range(200):
+        state = run.step(t, state, liveAgents)
+    bunnies = [agent for agent in liveAgents.values() if agent.IS_PREY]
+    # Verify
+    assert run.count(liveAgents) == (len(bunnies), len(liveAgents) - len(bunnies),
+                                     sum(agent.speed for agent in bunnies) / max(len(bunnies), 0.1))
+    assert liveAgents.counters.speed_histogram().sum() == len(bunnies)
+
+
+def test_time_series_grows():
+    # Test
+    series = TimeSeries(("t", "pop"), capacity=2)
+    for t in range(5):
+        series.append(t, 10 * t)
+    # Verify
+    assert list(series["pop"]) == [0, 10, 20, 30, 40]
+
+
+def test_ring_buffer_keeps_last_values():
+    # Test
+    series = RingBuffer(("t",), capacity=3)
+    for t in range(7):
+        series.append(t)
+    # Verify
+    assert np.array_equal(series["t"], [4, 5, 6])
+    assert len(series) == 3
+
+
+def test_ring_buffer_reads_values_before_filling():
+    # Test
+    series = RingBuffer(("t",), capacity=5)
+    reads = []
+    for t in range(4):
+        series.append(10 + t)
+        reads.append(series["t"].tolist())
+    # Verify
+    assert reads == [[10], [10, 11], [10, 11, 12], [10, 11, 12, 13]]
+    assert len(RingBuffer(("t",), capacity=5)["t"]) == 0
@@ -1,15 +1,108 @@
+from math import inf
+
+import numpy as np
+
 import agents
 import run
+from registry import AgentRegistry
+
+state, liveAgents = run.new_world()
 
 
 def test_detect_prey():
     # Test
-    minPrey, minKey = agents.detect_prey(run.liveAgents[1], run.liveAgents, agents.Bunny.IS_PREY)
+    minPrey, minKey = agents.detect_prey(liveAgents[1], liveAgents, agents.Bunny.IS_PREY)
     # Verify
     assert isinstance(minPrey, agents.Bunny)
     assert 0 <= minKey <= 100
 
 
+def test_cached_targets_give_same_run():
+    # Test
+    state, liveAgents = run.new_world(seed=5)
+    otherState, other = run.new_world(seed=5)
+    other.reach = lambda is_prey, steps: inf  # no cached target is ever provably the nearest, every search scans
+    for t in range(600):
+        state = run.step(t, state, liveAgents)
+        otherState = run.step(t, otherState, other)
+    # Verify
+    assert [(key, agent.x, agent.y) for key, agent in liveAgents.items()] == \
+        [(key, agent.x, agent.y) for key, agent in other.items()]
+    assert other.counters.targetHits == 0
+    assert 0 < liveAgents.counters.target_hit_rate() < 1
+
+
+def test_refresh_keeps_target():
+    # Test
+    liveAgents = AgentRegistry(targetRefresh=3)
+    fox = agents.Fox(0, 0, 1, 20, 100, 1, 100, 50, 60, 10, 100, 0, 0, 1)
+    far, near = agents.Bunny(5, 0, 2, 10, 0, 0, 1, 100), agents.Bunny(0, 6, 2, 10, 0, 0, 1, 100)
+    for agent in (fox, far, near):
+        liveAgents.add(agent)
+    first, firstKey = agents.detect_prey(fox, liveAgents, True)
+    near.y = 3
+    liveAgents.relocate(near)
+    liveAgents.grow_older()
+    kept, keptKey = agents.detect_prey(fox, liveAgents, True)  # not provably the nearest, kept by targetRefresh
+    liveAgents.grow_older()
+    liveAgents.grow_older()
+    refreshed, refreshedKey = agents.detect_prey(fox, liveAgents, True)
+    # Verify
+    assert first is kept is far
+    assert refreshed is near
+    assert (liveAgents.counters.targetHits, liveAgents.counters.targetScans) == (1, 2)
+
+
+def test_targets_are_kept_per_species():
+    # Test
+    liveAgents = AgentRegistry()
+    bunny, partner = agents.Bunny(0, 0, 1, 10, 0, 1, 1, 100), agents.Bunny(3, 0, 2, 10, 0, 0, 1, 100)
+    fox = agents.Fox(0, 8, 1, 20, 100, 0, 100, 50, 60, 10, 100, 0, 0, 1)
+    for agent in (bunny, partner, fox):
+        liveAgents.add(agent)
+    found = []
+    for t in range(2):  # a bunny looks for foxes, then for a partner, on every step
+        found.append((agents.detect_prey(bunny, liveAgents, False)[0], agents.detect_prey(bunny, liveAgents, True)[0]))
+        liveAgents.grow_older()
+    # Verify
+    assert found == [(fox, partner), (fox, partner)]
+    assert (liveAgents.counters.targetHits, liveAgents.counters.targetScans) == (2, 2)
+
+
+def test_parent_forgets_target_after_birth():
+    # Test
+    state = np.zeros((20, 20, 2), dtype=np.int32)
+    liveAgents = AgentRegistry(state)
+    mother, father, other = (agents.Fox(x, 0, 1, 20, 100, 0, 300, 50, 150, 10, 300, 0, 1, 1) for x in (0, 1, 10))
+    father.gestStatus = other.gestStatus = 0
+    for agent in (mother, father, other):
+        liveAgents.add(agent)
+    mother.behave(state, liveAgents, 100)  # mother moves on father and gives birth to id 4 there
+    father.x = 2
+    liveAgents.relocate(father)
+    liveAgents.grow_older()
+    # Verify
+    assert len(liveAgents) == 4
+    assert agents.detect_prey(mother, liveAgents, False) == (liveAgents[4], 4)
+
+
+def test_cached_targets_give_same_run_with_births():
+    # Test
+    params = run.parameters(n_bunnies=0, n_foxes=10, age_fox=0, gestChance_fox=0.5, hunger_fox=500,
+                            hungerThresMin_fox=0, w=20, h=20, speed_fox=1)  # foxes that mate on almost every step
+    state, liveAgents = run.new_world(params, "object", seed=8)
+    otherState, other = run.new_world(params, "object", seed=8)
+    other.reach = lambda is_prey, steps: inf
+    for t in range(20):
+        state = run.step(t, state, liveAgents, 800)
+        otherState = run.step(t, otherState, other, 800)
+    # Verify
+    assert len(liveAgents) > 10
+    assert [(key, agent.x, agent.y) for key, agent in liveAgents.items()] == \
+        [(key, agent.x, agent.y) for key, agent in other.items()]
+    assert liveAgents.counters.targetHits > 0
+
+
 if __name__ == "__main__":
     for i in range(100_000):
         test_detect_prey()
@@ -0,0 +1,24 @@
+import subprocess
+import sys
+
+import numpy as np
+
+import ecosystem
+
+
+def test_headless_does_not_import_matplotlib():
+    # Test
+    code = "import sys, ecosystem; print('matplotlib' in sys.modules)"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    # Verify
+    assert output.strip() == "False"
+
+
+def test_run_writes_time_series(tmp_path):
+    # Test
+    out = tmp_path / "stats.npz"
+    ecosystem.main(["run", "--steps", "50", "--seed", "0", "--out", str(out)])
+    # Verify
+    series = np.load(out)
+    assert len(series["t"]) == len(series["popBunny"]) == len(series["speed"]) == 50
+    assert (series["popFox"] >= 0).all()
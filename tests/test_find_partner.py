@@ -1,10 +1,12 @@
 import run
 
+state, liveAgents = run.new_world()
+
 
 def test_bunny_find_partner():
     # Test
-    l_a = run.liveAgents.copy()
-    l_a[1].find_partner(run.state, l_a, run.age_fox)
+    l_a = liveAgents.copy()
+    l_a[1].find_partner(state, l_a, run.age_fox)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,37 @@
+import json
+
+import numpy as np
+
+import agents
+import ecosystem
+import run
+from metrics import Metrics
+
+
+def test_metrics_do_not_change_the_run_and_are_removed():
+    # Test
+    detect_prey, step = agents.detect_prey, run.step
+    expected = ecosystem.simulate(300, seed=2)
+    with Metrics(every=0) as metrics:
+        measured = ecosystem.simulate(300, seed=2)
+    # Verify
+    for name in expected:
+        assert np.array_equal(expected[name], measured[name])
+    assert agents.detect_prey is detect_prey and run.step is step
+    summary = metrics.summary()
+    assert summary["ticks"] == 300 and summary["phases"]["step"]["calls"] == 300
+    assert summary["phases"]["detect_prey"]["calls"] > 0 and summary["scans"] > 0
+    assert summary["phases"]["step"]["seconds"] >= summary["phases"]["detect_prey"]["seconds"]
+
+
+def test_metrics_are_dumped_every_n_ticks(tmp_path):
+    # Test
+    path = tmp_path / "metrics.jsonl"
+    with Metrics(every=100, out=str(path)) as metrics:
+        ecosystem.simulate(250, engine="vectorized", seed=1)
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    # Verify
+    assert [line["t"] for line in lines] == [100, 200]
+    assert all(line["ticks"] == 100 and line["phases"]["step"]["calls"] == 100 for line in lines)
+    assert lines == metrics.dumps
+    assert metrics.summary()["ticks"] == 250
@@ -0,0 +1,48 @@
+import benchmarks
+import run
+from pool import AgentPool
+
+
+def run_counts(pooled, steps=500):
+    # short-lived bunnies: the first generation dies at step 300 and its objects are reused by the next births
+    params = run.parameters(age_bunny=300, gestChance_bunny=0.003)
+    state, liveAgents = run.new_world(params, "object", seed=2)
+    if not pooled:
+        liveAgents.pool = None
+    counts = []
+    for t in range(steps):
+        state = run.step(t, state, liveAgents, params["age_fox"])
+        counts.append(run.count(liveAgents))
+    return counts, liveAgents
+
+
+def test_pooled_run_is_identical_to_unpooled_run():
+    # Test
+    pooled, liveAgents = run_counts(True)
+    unpooled, _ = run_counts(False)
+    # Verify
+    assert pooled == unpooled
+    assert liveAgents.pool.reused > 0
+
+
+def test_recycled_agents_are_not_alive():
+    # Test
+    _, liveAgents = run_counts(True)
+    free = [agent for agents in liveAgents.pool.free.values() for agent in agents]
+    # Verify
+    assert free and all(agent.diedAt is not None for agent in free)
+    assert not {id(agent) for agent in free} & {id(agent) for agent in liveAgents.values()}
+    assert len({agent.id for agent in liveAgents.values()}) == len(liveAgents)
+
+
+def test_clone_reinitializes_dead_agent():
+    # Test
+    pool = AgentPool()
+    parent, dead = benchmarks.new_fox(), benchmarks.new_fox()
+    dead.hunger, dead.diedAt, dead.id, dead.target = 1, 5, 7, [(None, None, 0, 0, 0, 0), None]
+    pool.release([dead])
+    newborn = parent.clone(42, pool)
+    # Verify
+    assert newborn is dead
+    assert (newborn.age, newborn.hunger, newborn.diedAt, newborn.target) == (42, parent.hunger, None, [None, None])
+    assert pool.stats() == {"free": 0, "created": 0, "reused": 1, "released": 1, "reuseRate": 1.0}
@@ -0,0 +1,37 @@
+import numpy as np
+
+from agents import Bunny, random_movement
+from randomness import BatchedRandom
+
+
+def test_restored_state_continues_the_stream():
+    for consumed in (0, 5, 16, 17, 40):
+        # Test
+        rng = BatchedRandom(3, blockSize=16)
+        for i in range(consumed):
+            rng.random()
+        state = rng.getstate()
+        expected = [rng.random() for i in range(40)]
+        restored = BatchedRandom(blockSize=8)
+        restored.setstate(state)
+        # Verify
+        assert [restored.random() for i in range(40)] == expected
+
+
+def test_random_movement_is_uniform_among_legal_moves():
+    # Test
+    rng = BatchedRandom(0)
+    state = np.zeros((5, 5, 2), dtype=np.int32)
+    counts = {}
+    for x, y in ((2, 2), (0, 2), (0, 0)):
+        for i in range(4000):
+            bunny = Bunny(x, y, 1, 1, 0, 0, 1, 10)
+            random_movement(bunny, state, rng)
+            counts[(x, y, bunny.x, bunny.y)] = counts.get((x, y, bunny.x, bunny.y), 0) + 1
+    # Verify
+    assert sorted(key[2:] for key in counts if key[:2] == (2, 2)) == [(1, 2), (2, 1), (2, 3), (3, 2)]
+    assert sorted(key[2:] for key in counts if key[:2] == (0, 2)) == [(0, 1), (0, 3), (1, 2)]
+    assert sorted(key[2:] for key in counts if key[:2] == (0, 0)) == [(0, 1), (1, 0)]
+    for (x, y, newX, newY), n in counts.items():
+        legal = {(2, 2): 4, (0, 2): 3, (0, 0): 2}[(x, y)]
+        assert abs(n - 4000 / legal) < 0.1 * 4000 / legal
@@ -0,0 +1,36 @@
+import numpy as np
+
+import ecosystem
+import run
+from recording import Recorder, Replay
+
+
+def test_replay_matches_simulation(tmp_path):
+    # Test
+    path = str(tmp_path / "run.rec")
+    series = ecosystem.simulate(300, seed=0, record=path, recordEvery=3)
+    with Replay(path) as replay:
+        stats = replay.statistics()
+        frame = replay.frame(replay.seek(150))
+        # Verify
+        assert len(replay) == 100
+        assert np.array_equal(stats["t"], series["t"][2::3])
+        assert np.array_equal(stats["popBunny"], series["popBunny"][2::3])
+        assert np.allclose(stats["speed"], series["speed"][2::3])
+        assert len(frame) == series["popBunny"][149] + series["popFox"][149]
+
+
+def test_recording_is_split_in_chunks(tmp_path):
+    # Test
+    path = str(tmp_path / "run.rec")
+    state, liveAgents = run.new_world()
+    with Recorder(path, run.w, run.h, chunkFrames=4) as recorder:
+        for t in range(10):
+            state = run.step(t, state, liveAgents)
+            recorder.record(t + 1, liveAgents)
+    with Replay(path) as replay:
+        # Verify
+        assert len(replay.chunks) == 3
+        assert replay.seek(6) == 5 and replay.ticks[5] == 6
+        last = replay.frame(9)
+        assert sorted(zip(last["x"], last["y"])) == sorted((agent.x, agent.y) for agent in liveAgents.values())
@@ -0,0 +1,71 @@
+from math import inf
+
+import numpy as np
+
+import agents
+import run
+from registry import AgentRegistry
+from topology import distance
+
+
+def make_registry(n):
+    liveAgents = AgentRegistry()
+    for i in range(n):
+        liveAgents.add(agents.Bunny(i, i, 2, 10, 0, 0, 3, 100))
+    return liveAgents
+
+
+def test_ids_are_never_reused():
+    # Test
+    liveAgents = make_registry(3)
+    liveAgents.remove(liveAgents[3])
+    newborn = agents.Bunny(0, 0, 2, 10, 0, 0, 3, 100)
+    # Verify
+    assert liveAgents.add(newborn) == 4 == newborn.id
+    assert list(liveAgents) == [1, 2, 4]
+
+
+def test_snapshot_yields_agents_alive_at_start():
+    # Test
+    liveAgents = make_registry(4)
+    liveAgents.remove(liveAgents[1])
+    seen = []
+    for agent in liveAgents.snapshot():
+        seen.append(agent.id)
+        if agent.id == 2:
+            liveAgents.remove(liveAgents[3])  # removed during the iteration, still yielded
+            liveAgents.add(agents.Bunny(0, 0, 2, 10, 0, 0, 3, 100))  # added during the iteration, not yielded
+    # Verify
+    assert seen == [2, 3, 4]
+    assert [agent.id for agent in liveAgents.snapshot()] == [2, 4, 5]
+
+
+def test_occupancy_follows_moves_births_and_deaths():
+    # Test
+    state, liveAgents = run.new_world()
+    for t in range(100):
+        state = run.step(t, state, liveAgents)
+    # Verify
+    expected = np.zeros_like(state)
+    for agent in liveAgents.values():
+        expected[agent.y, agent.x, 0 if agent.IS_PREY else 1] += 1
+    assert state.dtype == np.int32
+    assert (state == expected).all()
+    bunny = next(agent for agent in liveAgents.values() if agent.IS_PREY)
+    assert liveAgents.occupied(bunny.x, bunny.y, True)
+
+
+def test_copy_finds_nearest_agents():
+    # Test
+    state, liveAgents = run.new_world(seed=3)
+    copied = liveAgents.copy()
+    state = copied.occupancy
+    for t in range(200):
+        state = run.step(t, state, copied)
+    # Verify
+    for agent in list(copied.values()):
+        for is_prey in (True, False):
+            dist, key = min(((distance(agent.x, agent.y, other.x, other.y), key) for key, other in copied.items()
+                             if other.IS_PREY is is_prey and other is not agent), default=(inf, None))
+            expected = (copied[key], key) if dist <= agent.visibility else (None, None)
+            assert agents.detect_prey(agent, copied, is_prey) == expected
@@ -0,0 +1,41 @@
+import numpy as np
+
+import ecosystem
+import replicas
+import run
+import sweep
+
+
+def test_every_replica_matches_its_own_vectorized_run():
+    for params in (run.parameters(), run.parameters(n_bunnies=0, n_foxes=3, hunger_fox=20)):
+        # Test
+        seeds = [3, 4, 5]
+        batch = replicas.simulate(400, params, seeds)
+        # Verify
+        for seed, series in zip(seeds, batch):
+            expected = ecosystem.simulate(400, params, "vectorized", seed)
+            for name in expected:
+                assert np.array_equal(series[name], expected[name])
+    assert [len(series["t"]) for series in batch] == [20, 20, 20]
+
+
+def test_replica_random_follows_every_stream():
+    # Test
+    rng = replicas.ReplicaRandom([np.random.default_rng(seed) for seed in range(3)], blockSize=4)
+    draws = [rng.random(groups) for groups in ([0, 1, 0, 2, 0], [2] * 7, [1, 0, 1], [])]
+    # Verify
+    streams = [np.random.default_rng(seed).random(10) for seed in range(3)]
+    assert np.array_equal(draws[0], [streams[0][0], streams[1][0], streams[0][1], streams[2][0], streams[0][2]])
+    assert np.array_equal(draws[1], streams[2][1:8])
+    assert np.array_equal(draws[2], [streams[1][1], streams[0][3], streams[1][2]])
+    assert len(draws[3]) == 0
+
+
+def test_replicas_sweep_matches_vectorized_sweep():
+    # Test
+    grid = {"hungerReward_fox": [100, 150]}
+    batched = sweep.sweep(grid, [0, 1], 50, "replicas", processes=2)
+    single = sweep.sweep(grid, [0, 1], 50, "vectorized", processes=2)
+    # Verify
+    key = lambda result: (result["hungerReward_fox"], result["seed"])
+    assert sorted(batched, key=key) == sorted(single, key=key)
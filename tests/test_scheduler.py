@@ -0,0 +1,53 @@
+import numpy as np
+
+import benchmarks
+import run
+from agents import Bunny
+from registry import AgentRegistry
+
+
+def test_due_agents_in_id_order():
+    # Test
+    liveAgents = AgentRegistry()
+    for speed in (2, 3, 2, 5, 3, 6):
+        liveAgents.add(Bunny(0, 0, speed, 1, 0, 0, 1, 10))
+    liveAgents.remove(liveAgents[3])
+    # Verify
+    assert [agent.id for agent in liveAgents.scheduler.due(6)] == [1, 2, 5, 6]
+    assert [agent.id for agent in liveAgents.scheduler.due(4)] == [1]
+    assert [agent.id for agent in liveAgents.scheduler.due(7)] == []
+    assert len(liveAgents.scheduler) == len(liveAgents) == 5
+
+
+def test_step_matches_every_agent_acting():
+    # Test
+    state, liveAgents = run.new_world(seed=2)
+    otherState, other = run.new_world(seed=2)
+    for t in range(600):
+        state = run.step(t, state, liveAgents, run.age_fox)
+        other.grow_older()
+        for agent in other.snapshot():
+            agent.act(t, otherState, other, run.age_fox)
+        # Verify
+        assert [(key, agent.x, agent.y, agent.age) for key, agent in liveAgents.items()] == \
+            [(key, agent.x, agent.y, agent.age) for key, agent in other.items()]
+    assert np.array_equal(state, otherState)
+
+
+def test_agents_die_when_age_or_hunger_reaches_zero():
+    # Test
+    liveAgents = AgentRegistry()
+    bunny = Bunny(0, 0, 2, 10, 0, 0, 1, 3)
+    fox = benchmarks.new_fox()
+    fox.age, fox.maxHunger, fox.hunger = 100, 8, 5
+    immortal = Bunny(0, 0, 2, 10, 0, 0, 1, 0)  # age never reaches 0 when it starts there
+    for agent in (bunny, fox, immortal):
+        liveAgents.add(agent)
+    dying = [[agent.id for agent in liveAgents.grow_older()] for t in range(4)]
+    fox.hunger += 20  # eating reschedules the death of the fox, hunger can't go over maxHunger
+    for t in range(9):
+        dying.append([agent.id for agent in liveAgents.grow_older()])
+    # Verify
+    assert dying == [[], [], [1], [], [], [], [], [], [], [], [], [], [2]]
+    assert (bunny.age, immortal.age, fox.hunger) == (-10, -13, 0)
+    assert len(liveAgents.scheduler) == len(liveAgents) == 3  # grow_older does not remove the agents
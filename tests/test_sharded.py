@@ -0,0 +1,101 @@
+import numpy as np
+
+import ecosystem
+import run
+import sharded
+import vectorized
+from recording import Replay
+
+
+def test_agents_migrate_between_tiles_without_being_lost():
+    # Test
+    params = run.parameters(w=30, h=30, n_bunnies=200, n_foxes=0, gestChance_bunny=0)
+    _, world = run.new_world(params, "sharded", seed=2, tiles=3)
+    state = np.zeros((30, 30, 2), dtype=np.int32)
+    with world:
+        world.occupancy(state)
+        speeds = np.sort(world.gather().bunnies.speed)
+        for t in range(300):
+            state = run.step(t, state, world, params["age_fox"])
+        bunnies = world.gather().bunnies
+        count = run.count(world)
+    # Verify
+    assert count[0] == len(bunnies) == state[:, :, 0].sum() == 200
+    assert np.array_equal(np.sort(bunnies.speed), speeds)
+    assert ((0 <= bunnies.y) & (bunnies.y < 30) & (0 <= bunnies.x) & (bunnies.x < 30)).all()
+
+
+def test_state_and_count_match_the_agents():
+    # Test
+    params = run.parameters(w=40, h=40, n_bunnies=150, n_foxes=8)
+    _, world = run.new_world(params, "sharded", seed=3, tiles=2)
+    state = np.zeros((40, 40, 2), dtype=np.int32)
+    with world:
+        world.occupancy(state)
+        for t in range(200):
+            state = run.step(t, state, world, params["age_fox"])
+            liveBunnies, liveFoxes, avgSpeed = run.count(world)
+        gathered = world.gather()
+    expected = np.zeros_like(state)
+    vectorized.count_cells(expected, gathered)
+    # Verify
+    assert np.array_equal(state, expected)
+    assert (liveBunnies, liveFoxes) == (len(gathered.bunnies), len(gathered.foxes))
+    assert avgSpeed == gathered.bunnies.speed.mean()
+
+
+def test_same_seed_and_tiles_give_same_run():
+    # Test
+    params = run.parameters(w=40, h=40, n_bunnies=150)
+    first = ecosystem.simulate(150, params, "sharded", seed=5, tiles=2)
+    second = ecosystem.simulate(150, params, "sharded", seed=5, tiles=2)
+    # Verify
+    for name in first:
+        assert np.array_equal(first[name], second[name])
+
+
+def test_non_square_world_keeps_every_agent():
+    # Test
+    params = run.parameters(w=60, h=30, n_bunnies=200, n_foxes=0, gestChance_bunny=0)
+    populations = {engine: ecosystem.simulate(100, params, engine, seed=1, tiles=2)["popBunny"][-1]
+                   for engine in ("object", "vectorized", "sharded")}
+    # Verify
+    assert populations == {"object": 200, "vectorized": 200, "sharded": 200}
+
+
+def test_sharded_run_has_no_grid(tmp_path):
+    # Test
+    params = run.parameters(w=60, h=30, n_bunnies=100)
+    path = str(tmp_path / "run.rec")
+    state, world = run.new_world(params, "sharded", seed=1, tiles=2)
+    world.close()
+    series = ecosystem.simulate(20, params, "sharded", seed=1, tiles=2, record=path, recordEvery=5)
+    with Replay(path) as replay:
+        # Verify
+        assert state is None
+        assert (replay.w, replay.h) == (60, 30)
+        assert len(replay.frame(replay.seek(20))) == series["popBunny"][-1] + series["popFox"][-1]
+
+
+def test_buffers_grow_with_the_population():
+    # Test
+    params = run.parameters(n_bunnies=20, n_foxes=3, gestChance_bunny=0.01)
+    states = []
+    with sharded.ShardedWorld(params, 2, 3, capacity=8) as growing, \
+            sharded.ShardedWorld(params, 2, 3, capacity=100000) as large:
+        for world in (growing, large):
+            state = np.zeros((50, 50, 2), dtype=np.int32)
+            world.occupancy(state)
+            for t in range(300):
+                state = run.step(t, state, world, params["age_fox"])
+            states.append(state)
+        gathered = growing.gather()
+        expected = large.gather()
+        capacity = growing.capacity
+    counted = np.zeros_like(states[0])
+    vectorized.count_cells(counted, gathered)
+    # Verify
+    assert capacity > 23  # the 23 initial agents
+    for name in gathered.bunnies.names:
+        assert np.array_equal(getattr(gathered.bunnies, name), getattr(expected.bunnies, name))
+    assert np.array_equal(states[0], states[1]) and np.array_equal(states[0], counted)
@@ -0,0 +1,38 @@
+from math import inf
+
+import agents
+import run
+from registry import AgentRegistry
+
+
+def brute_force_detect(agent, liveAgents, is_prey):
+    minPrey, minKey, minDist = None, None, inf
+    for key, prey in liveAgents.items():
+        if prey.IS_PREY == is_prey and prey is not agent:
+            dist = agents.distance(agent.x, agent.y, prey.x, prey.y)
+            if minDist > dist <= agent.visibility:
+                minPrey, minKey, minDist = prey, key, dist
+    return minPrey, minKey
+
+
+def test_detect_prey_matches_full_scan():
+    # Test
+    state, liveAgents = run.new_world(seed=0)
+    for key, agent in liveAgents.items():
+        for is_prey in (True, False):
+            # Verify
+            assert agents.detect_prey(agent, liveAgents, is_prey) == brute_force_detect(agent, liveAgents, is_prey)
+
+
+def test_relocate_and_remove():
+    # Test
+    l_a = AgentRegistry()
+    l_a.add(agents.Bunny(0, 0, 2, 10, 0, 0, 3, 100))
+    l_a.add(agents.Bunny(1, 1, 2, 10, 0, 0, 3, 100))
+    bunny = l_a[1]
+    bunny.x, bunny.y = 25, 25
+    l_a.relocate(bunny)
+    l_a.remove(l_a[2])
+    # Verify
+    assert list(l_a.nearby(25, 25, 0, True)) == [(1, bunny)]
+    assert list(l_a.nearby(0, 0, 5, True)) == []
@@ -0,0 +1,22 @@
+import csv
+
+import sweep
+
+
+def test_expand_grid():
+    # Test
+    combinations = sweep.expand_grid({"speed_fox": [3, 4], "visibility_fox": [50, 100, 150]})
+    # Verify
+    assert len(combinations) == 6
+    assert {"speed_fox": 3, "visibility_fox": 150} in combinations
+
+
+def test_sweep_writes_one_line_per_run(tmp_path):
+    # Test
+    out = tmp_path / "sweep.csv"
+    results = sweep.sweep({"hungerReward_fox": [100, 150]}, [0, 1], 30, processes=2, out=str(out))
+    # Verify
+    with open(out) as file:
+        rows = list(csv.DictReader(file))
+    assert len(results) == len(rows) == 4
+    assert {(int(row["hungerReward_fox"]), int(row["seed"])) for row in rows} == {(100, 0), (100, 1), (150, 0), (150, 1)}
@@ -0,0 +1,50 @@
+from math import inf
+
+import numpy as np
+
+import agents
+import run
+from topology import MOVES, Topology
+
+
+def test_bounded_moves_stop_at_borders_and_toroidal_moves_wrap():
+    # Test
+    bounded, torus = Topology(4, 5), Topology(4, 5, wrap=True)
+    # Verify
+    for y in range(4):
+        for x in range(5):
+            legal = tuple((dx, dy) for dx, dy in MOVES if 0 <= x + dx < 5 and 0 <= y + dy < 4)
+            assert bounded.moves(x, y) == legal
+            assert torus.moves(x, y) == MOVES
+            assert [(torus.xs[x + dx], torus.ys[y + dy]) for dx, dy in MOVES] == [
+                ((x + dx) % 5, (y + dy) % 4) for dx, dy in MOVES]
+    assert torus.distance(0, 0, 4, 3) == bounded.distance(0, 0, 1, 1)
+    assert torus.unit_vector(0, 2, 4, 2) == (-1.0, 0.0)
+
+
+def test_agents_chase_across_the_borders_of_a_toroidal_world():
+    # Test
+    state = np.zeros((50, 50, 2), dtype=np.int32)
+    fox, bunny = agents.Fox(0, 5, 1, 10, 100, 1, 100, 50, 150, 10, 200, 0, 0, 1), agents.Bunny(49, 5, 1, 10, 0, 0, 1, 100)
+    agents.move_towards(fox, bunny, state, 1, topology=Topology(50, 50, wrap=True))
+    # Verify
+    assert (fox.x, fox.y) == (49, 5)
+
+
+def test_detect_prey_matches_full_scan_in_a_toroidal_world():
+    # Test
+    params = run.parameters(wrap=True, n_bunnies=200, visibility_fox=15)
+    state, liveAgents = run.new_world(params, "object", seed=3)
+    for t in range(300):
+        state = run.step(t, state, liveAgents, params["age_fox"])
+    topology = liveAgents.topology
+    # Verify
+    for agent in liveAgents.values():
+        for is_prey in (True, False):
+            minPrey, minKey, minDist = None, None, inf
+            for key, prey in liveAgents.items():
+                if prey.IS_PREY == is_prey and prey is not agent:
+                    dist = topology.distance(agent.x, agent.y, prey.x, prey.y)
+                    if minDist > dist <= agent.visibility:
+                        minPrey, minKey, minDist = prey, key, dist
+            assert agents.detect_prey(agent, liveAgents, is_prey) == (minPrey, minKey)
@@ -0,0 +1,41 @@
+import numpy as np
+
+import run
+import vectorized
+
+
+def test_nearest_matches_full_scan():
+    # Test
+    rng = np.random.default_rng(0)
+    qx, qy = rng.integers(0, 40, 30), rng.integers(0, 30, 30)
+    tx, ty = rng.integers(0, 40, 80), rng.integers(0, 30, 80)
+    idx, dist = vectorized.nearest(qx, qy, 10, tx, ty, 40, 30, 4)
+    # Verify
+    for q in range(len(qx)):
+        d = np.sqrt((tx - qx[q]) ** 2 + (ty - qy[q]) ** 2)
+        expected = int(np.argmin(d)) if d.min() <= 10 else -1
+        assert idx[q] == expected
+
+
+def test_step_keeps_agents_in_bounds():
+    # Test
+    state, world = vectorized.create_world(30, 20, 200, 2, 9, 10, 0.5, 0, 3, 5000, 10, 4, 100, 1, 800, 250, 350, 450,
+                                           150, 500, 0.0004, 0, 1, seed=0)
+    for t in range(50):
+        vectorized.step(t, state, world, 5000, 800)
+    # Verify
+    b = world.bunnies
+    assert ((0 <= b.x) & (b.x < 20) & (0 <= b.y) & (b.y < 30)).all()
+    assert vectorized.count(world)[0] == len(b) == state[:, :, 0].sum()
+
+
+def test_parameters_are_passed_by_name():
+    # Test
+    params = run.parameters(w=60, h=30, age_fox=700, huntStatus_fox=1)
+    state, liveAgents = run.new_world(params, "object", seed=0)
+    vectorState, world = run.new_world(params, "vectorized", seed=0)
+    foxes = [agent for agent in liveAgents.values() if not agent.IS_PREY]
+    # Verify
+    assert state.shape == vectorState.shape == (30, 60, 2)
+    assert all((fox.age, fox.huntStatus) == (700, 1) for fox in foxes)
+    assert (world.foxes.age == 700).all() and (world.foxes.huntStatus == 1).all()
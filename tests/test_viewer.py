@@ -0,0 +1,50 @@
+import queue
+import threading
+
+import viewer
+from counters import RingBuffer
+
+
+def test_worker_publishes_every_step_of_the_series():
+    # Test
+    snapshots = queue.Queue(maxsize=1)
+    stop = threading.Event()
+    worker = threading.Thread(target=viewer.simulation_worker, args=(snapshots, stop), kwargs={"every": 5, "steps": 100})
+    worker.start()
+    series = RingBuffer(viewer.SERIES, capacity=1000)
+    done = False
+    latest = None
+    while not done:
+        received, done = viewer.latest_snapshot(snapshots, series)
+        latest = received or latest
+    worker.join()
+    # Verify
+    assert list(series["T"]) == list(range(1, 101))
+    assert latest["t"] == 100
+    assert latest["bunnies"].shape == (series["popBunny"][-1], 2)
+
+
+class FullQueue(queue.Queue):
+    """
+    Queue reporting itself full to the worker, as when the viewer never reads it
+    """
+
+    def full(self):
+        return True
+
+    def put_nowait(self, item):
+        raise queue.Full
+
+
+def test_worker_skips_snapshots_of_full_queue(monkeypatch):
+    # Test
+    built = []
+    snapshot = viewer.snapshot
+    monkeypatch.setattr(viewer, "snapshot", lambda *args: built.append(args[0]) or snapshot(*args))
+    snapshots = FullQueue()
+    viewer.simulation_worker(snapshots, threading.Event(), every=5, steps=50)
+    last = snapshots.get_nowait()
+    # Verify
+    assert built == [50]  # only the last snapshot, put once the simulation is over
+    assert list(last["series"]["T"]) == list(range(1, 51))
+    assert snapshots.get_nowait() is None
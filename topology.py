@@ -0,0 +1,137 @@
+"""
+Python-Ecosystem by Alexandre Sajus
+
+More information at:
+https://github.com/AlexandreSajus/PythonEcosystem
+
+topology.py takes care of the geometry of the world: the moves legal from every cell, and the distances and directions
+between agents, in a bounded world whose borders stop the agents or in a toroidal one whose borders bring them back on
+the opposite side
+"""
+
+import functools
+from math import sqrt
+
+MOVES = ((1, 0), (-1, 0), (0, 1), (0, -1))  # the four moves of an agent, move i is bit i of the masks of Topology
+# LEGAL[mask]: the moves left when the moves of the bits of mask are blocked, in MOVES order
+LEGAL = tuple(tuple(move for i, move in enumerate(MOVES) if not mask >> i & 1) for mask in range(1 << len(MOVES)))
+
+
+@functools.lru_cache(maxsize=128, typed=False)
+def distance(x1, y1, x2, y2):
+    """
+    Measures the distance between two agents
+    :param agent1, agent2: an animal, bunny or fox
+    :type agent1, agent2: Object
+    :return: distance
+    :rtype: Float
+    """
+    x_dist = x1 - x2
+    y_dist = y1 - y2
+    return sqrt((x_dist*x_dist) + (y_dist*y_dist))
+
+
+def intervals(center, radius, size):
+    """
+    :return: intervals (start, end) of [0, size) covering [center - radius, center + radius] on a circle of length size
+    :rtype: List
+    """
+    start, end = center - radius, center + radius
+    if end - start + 1 >= size:
+        return [(0, size - 1)]
+    if start < 0:
+        return [(start + size, size - 1), (0, end)]
+    if end >= size:
+        return [(start, size - 1), (0, end - size)]
+    return [(start, end)]
+
+
+class Topology:
+    """
+    Tables of a h*w world, built once: the moves blocked by the borders from every column and every row as bitmasks
+    (a cell blocks blockedX[x] | blockedY[y]) and the coordinate reached by every move, so moving an agent is a lookup
+    instead of bounds checks. Nothing is blocked in a toroidal world (wrap), where distances and directions also take
+    the shortest way, across the borders if it is shorter
+    """
+    distance = staticmethod(distance)  # distance of a bounded world
+
+    def __init__(self, h, w, wrap=False):
+        """
+        :param h, w: size of the world (height, width), the shape of its state
+        :type h, w: Int
+        :param wrap: True for a toroidal world, False for a bounded one
+        :type wrap: Bool
+        """
+        self.h = h
+        self.w = w
+        self.wrap = wrap
+        self.blockedX = [0] * w
+        self.blockedY = [0] * h
+        if not wrap:
+            self.blockedX[0] |= 2
+            self.blockedX[-1] |= 1
+            self.blockedY[0] |= 8
+            self.blockedY[-1] |= 4
+        else:
+            self.distance = self.wrapped_distance
+        # xs[x + dx] is the column reached from x by a move of dx: index -1 reads the last item, so moving out of
+        # the world leads to the opposite border (bounded worlds block these moves before reading them)
+        self.xs = list(range(w)) + [0, w - 1]
+        self.ys = list(range(h)) + [0, h - 1]
+
+    def moves(self, x, y):
+        """
+        :return: moves legal from (x, y), in MOVES order
+        :rtype: Tuple
+        """
+        return LEGAL[self.blockedX[x] | self.blockedY[y]]
+
+    def delta(self, x1, y1, x2, y2):
+        """
+        :return: shortest vector (dx, dy) from (x1, y1) to (x2, y2)
+        :rtype: Tuple
+        """
+        dx = x2 - x1
+        dy = y2 - y1
+        if self.wrap:
+            if 2 * dx > self.w:
+                dx -= self.w
+            elif 2 * dx < -self.w:
+                dx += self.w
+            if 2 * dy > self.h:
+                dy -= self.h
+            elif 2 * dy < -self.h:
+                dy += self.h
+        return dx, dy
+
+    def wrapped_distance(self, x1, y1, x2, y2):
+        dx, dy = self.delta(x1, y1, x2, y2)
+        return distance(0, 0, dx, dy)
+
+    def unit_vector(self, x1, y1, x2, y2):
+        """
+        :return: unit vector (x, y) from (x1, y1) to (x2, y2)
+        :rtype: Tuple
+        """
+        d = max(self.distance(x1, y1, x2, y2), 0.1)
+        dx, dy = self.delta(x1, y1, x2, y2)
+        return dx/d, dy/d
+
+    def windows(self, x, y, radius):
+        """
+        :return: boxes (xMin, yMin, xMax, yMax) inside the world covering the square of half side radius around (x, y)
+        :rtype: List
+        """
+        if not self.wrap:
+            return [(x - radius, y - radius, x + radius, y + radius)]
+        return [(xMin, yMin, xMax, yMax) for xMin, xMax in intervals(x, radius, self.w)
+                for yMin, yMax in intervals(y, radius, self.h)]
+
+
+@functools.lru_cache(maxsize=16)
+def bounded(h, w):
+    """
+    :return: the topology of a bounded h*w world, shared by every caller
+    :rtype: Topology
+    """
+    return Topology(h, w)
@@ -0,0 +1,432 @@
+"""
+Python-Ecosystem by Alexandre Sajus
+
+More information at:
+https://github.com/AlexandreSajus/PythonEcosystem
+
+vectorized.py is an alternative engine storing every species as NumPy arrays (structure of arrays)
+Each phase of a step (aging, hunger, movement, predation, reproduction) is a batched array operation
+The behaviour follows agents.py, but agents of a phase all act on the positions of the start of that phase
+"""
+
+import functools
+
+import numpy as np
+
+# the four moves of random_movement: right, left, down, up
+DX = np.array([1, -1, 0, 0])
+DY = np.array([0, 0, 1, -1])
+
+
+class Herd:
+    """
+    All the agents of one species, one array per attribute (same attributes as Bunny or Fox in agents.py)
+    """
+
+    def __init__(self, **fields):
+        self.names = tuple(fields)
+        for name, values in fields.items():
+            setattr(self, name, np.asarray(values))
+
+    def __len__(self):
+        return len(self.x)
+
+    def keep(self, mask):
+        """
+        Only keeps the agents selected by mask (boolean array or indices)
+        """
+        for name in self.names:
+            setattr(self, name, getattr(self, name)[mask])
+
+    def extend(self, parents, repeats, **overrides):
+        """
+        Appends copies of the agents parents, parents[i] being copied repeats[i] times
+        :param overrides: attributes of the newborns that differ from the parents (age for example)
+        """
+        idx = np.repeat(parents, repeats)
+        if not len(idx):
+            return
+        for name in self.names:
+            values = getattr(self, name)
+            newborns = values[idx]
+            if name in overrides:
+                newborns[:] = overrides[name]
+            setattr(self, name, np.concatenate((values, newborns)))
+
+
+class VectorWorld:
+    """
+    World of the vectorized engine: both herds, the size of the grid and the random generator
+    """
+
+    def __init__(self, h, w, bunnies, foxes, rng, cellSize=4):
+        self.h = h
+        self.w = w
+        self.bunnies = bunnies
+        self.foxes = foxes
+        self.rng = rng
+        self.cellSize = cellSize  # side of the cells used to search neighbours
+
+
+@functools.lru_cache(maxsize=None)
+def ring_offsets(k):
+    """
+    Returns the cell offsets (dx, dy) at Chebyshev distance k, as a (m, 2) array
+    """
+    if k == 0:
+        return np.zeros((1, 2), dtype=np.int64)
+    r = np.arange(-k, k + 1)
+    dx, dy = np.meshgrid(r, r)
+    ring = np.maximum(np.abs(dx), np.abs(dy)) == k
+    return np.stack((dx[ring], dy[ring]), axis=1)
+
+
+def nearest(qx, qy, radius, tx, ty, w, h, cellSize, exclude=None, qg=None, tg=None):
+    """
+    For every query point, finds the closest target within radius (same rule as agents.detect_prey)
+    Targets are bucketed in cells of side cellSize and searched ring by ring around the cell of each query
+    :param qx, qy: coordinates of the queries
+    :type qx, qy: Array
+    :param radius: visibility of every query
+    :type radius: Array or Int
+    :param tx, ty: coordinates of the targets
+    :type tx, ty: Array
+    :param exclude: index of a target to ignore for every query (the query itself), None to ignore nothing
+    :type exclude: Array
+    :param qg, tg: world of every query and target when the points belong to several worlds (see replicas.py), a query
+    only finds targets of its world. None if there is a single world
+    :type qg, tg: Array
+    :return: index of the closest target (-1 if none, the lowest index on ties) and its distance
+    :rtype: Array, Array
+    """
+    n = len(qx)
+    bestIdx = np.full(n, -1, dtype=np.int64)
+    bestDist = np.full(n, np.inf)
+    if n == 0 or len(tx) == 0:
+        return bestIdx, bestDist
+    radius = np.broadcast_to(radius, (n,))
+    ncx = (w - 1) // cellSize + 1
+    ncy = (h - 1) // cellSize + 1
+    tcell = (ty // cellSize) * ncx + tx // cellSize
+    cells = ncx * ncy
+    if tg is not None:
+        # the cells of every world are numbered after those of the previous ones
+        tcell = tcell + tg * cells
+        qOffset = qg * cells
+        cells *= max(qg.max(), tg.max()) + 1
+    order = np.argsort(tcell, kind="stable")
+    counts = np.bincount(tcell, minlength=cells)
+    starts = np.cumsum(counts) - counts
+    qcx = qx // cellSize
+    qcy = qy // cellSize
+    active = np.arange(n)
+    k = 0
+    while len(active):
+        offsets = ring_offsets(k)
+        cx = qcx[active, None] + offsets[:, 0]
+        cy = qcy[active, None] + offsets[:, 1]
+        inside = (0 <= cx) & (cx < ncx) & (0 <= cy) & (cy < ncy)
+        cid = cy * ncx + cx
+        if tg is not None:
+            cid += qOffset[active, None]
+        cid = np.where(inside, cid, 0).ravel()
+        cnt = np.where(inside.ravel(), counts[cid], 0)
+        total = cnt.sum()
+        if total:
+            # one pair per (query, target in one of the cells of the ring)
+            pairQ = np.repeat(np.repeat(active, len(offsets)), cnt)
+            within = np.arange(total) - np.repeat(np.cumsum(cnt) - cnt, cnt)
+            pairT = order[np.repeat(starts[cid], cnt) + within]
+            dx = tx[pairT] - qx[pairQ]
+            dy = ty[pairT] - qy[pairQ]
+            dist = np.sqrt(dx * dx + dy * dy)
+            ok = dist <= radius[pairQ]
+            if exclude is not None:
+                ok &= pairT != exclude[pairQ]
+            pairQ, pairT, dist = pairQ[ok], pairT[ok], dist[ok]
+            if len(dist):
+                # for every query keep the closest target, the lowest index on ties
+                sel = np.lexsort((pairT, dist, pairQ))
+                pairQ, pairT, dist = pairQ[sel], pairT[sel], dist[sel]
+                first = np.ones(len(pairQ), dtype=bool)
+                first[1:] = pairQ[1:] != pairQ[:-1]
+                q, target, d = pairQ[first], pairT[first], dist[first]
+                better = (d < bestDist[q]) | ((d == bestDist[q]) & (target < bestIdx[q]))
+                bestIdx[q[better]] = target[better]
+                bestDist[q[better]] = d[better]
+        # every target in the next rings is farther than k*cellSize
+        reach = k * cellSize
+        active = active[(bestDist[active] > reach) & (radius[active] > reach)]
+        k += 1
+    return bestIdx, bestDist
+
+
+def random_movement(x, y, w, h, rng, group=None):
+    """
+    Moves every agent randomly where it is legal to move, each legal move being equally likely
+    :param group: world of every agent if they belong to several worlds (see draw), None if there is a single world
+    :type group: Array
+    :return: new coordinates
+    :rtype: Array, Array
+    """
+    moveX = x[:, None] + DX
+    moveY = y[:, None] + DY
+    legal = (0 <= moveX) & (moveX < w) & (0 <= moveY) & (moveY < h)
+    pick = (rng.random(len(x) if group is None else group) * legal.sum(axis=1)).astype(np.int64)
+    # index of the (pick+1)-th legal move
+    choice = (np.cumsum(legal, axis=1) <= pick[:, None]).sum(axis=1)
+    rows = np.arange(len(x))
+    return moveX[rows, choice], moveY[rows, choice]
+
+
+def move_towards(x, y, tx, ty, direction, w, h, rng, group=None):
+    """
+    Moves every agent one cell towards its target (direction=1) or away from it (direction=-1) along the axis
+    with the largest gap. If the move is illegal, moves randomly
+    :param group: world of every agent if they belong to several worlds (see draw), None if there is a single world
+    :type group: Array
+    :return: new coordinates
+    :rtype: Array, Array
+    """
+    dx = tx - x
+    dy = ty - y
+    horizontal = np.abs(dx) >= np.abs(dy)
+    newX = np.where(horizontal, x + np.where(dx > 0, 1, -1) * direction, x)
+    newY = np.where(horizontal, y, y + np.where(dy > 0, 1, -1) * direction)
+    illegal = ~((0 <= newX) & (newX < w) & (0 <= newY) & (newY < h))
+    if illegal.any():
+        newX[illegal], newY[illegal] = random_movement(x[illegal], y[illegal], w, h, rng,
+                                                       None if group is None else group[illegal])
+    return newX, newY
+
+
+def create_world(h, w, n_bunnies, speed_bunny_min, speed_bunny_max, visibility_bunny, gestChance_bunny,
+                 gestStatus_bunny, gestNumber_bunny, age_bunny, n_foxes, speed_fox, visibility_fox, huntStatus_fox, age_fox,
+                 hunger_fox, hungerThresMin_fox, hungerThresMax_fox, hungerReward_fox, maxHunger_fox, gestChance_fox,
+                 gestStatus_fox, gestNumber_fox, targetRefresh=0, targetSlack=5, wrap=False, seed=None, grid=True):
+    """
+    Creates an initial world, same parameters as run.create_world
+    targetRefresh and targetSlack are ignored, the vectorized engine searches every target on every step
+    The vectorized engine only simulates bounded worlds, wrap raises a ValueError
+    :param seed: seed of the random generator of the world
+    :type seed: Int
+    :param grid: False to skip the state, whose size follows the world and not its agents (see sharded.ShardedWorld)
+    :type grid: Bool
+    :return: state, integer array of size h*w*2 with the number of bunnies (state[y, x, 0]) and foxes (state[y, x, 1])
+    on each spot, None without grid
+    :rtype: Array
+    :return: world, the herds of the world
+    :rtype: VectorWorld
+    """
+    if wrap:
+        raise ValueError("toroidal worlds (wrap) are only simulated by the object engine")
+    rng = np.random.default_rng(seed)
+    bunnies = Herd(
+        x=rng.integers(0, w, n_bunnies),
+        y=rng.integers(0, h, n_bunnies),
+        speed=rng.integers(speed_bunny_min, speed_bunny_max + 1, n_bunnies),
+        visibility=np.full(n_bunnies, visibility_bunny),
+        gestChance=np.full(n_bunnies, gestChance_bunny, dtype=float),
+        gestStatus=np.full(n_bunnies, gestStatus_bunny),
+        gestNumber=np.full(n_bunnies, gestNumber_bunny),
+        age=np.full(n_bunnies, age_bunny),
+    )
+    foxes = Herd(
+        x=rng.integers(0, w, n_foxes),
+        y=rng.integers(0, h, n_foxes),
+        speed=np.full(n_foxes, speed_fox),
+        visibility=np.full(n_foxes, visibility_fox),
+        gestChance=np.full(n_foxes, gestChance_fox, dtype=float),
+        gestStatus=np.full(n_foxes, gestStatus_fox),
+        gestNumber=np.full(n_foxes, gestNumber_fox),
+        age=np.full(n_foxes, age_fox),
+        huntStatus=np.full(n_foxes, huntStatus_fox),
+        hunger=np.full(n_foxes, hunger_fox),
+        hungerThresMin=np.full(n_foxes, hungerThresMin_fox),
+        hungerThresMax=np.full(n_foxes, hungerThresMax_fox),
+        hungerReward=np.full(n_foxes, hungerReward_fox),
+        maxHunger=np.full(n_foxes, maxHunger_fox),
+    )
+    world = VectorWorld(h, w, bunnies, foxes, rng)
+    if not grid:
+        return None, world
+    state = np.zeros((h, w, 2), dtype=np.int32)
+    count_cells(state, world)
+    return state, world
+
+
+def count_cells(state, world):
+    """
+    Writes in state the number of bunnies and foxes on each spot, state[r] being the grid of world r if the herds hold
+    several worlds
+    """
+    for layer, herd in enumerate((world.bunnies, world.foxes)):
+        cell = herd.y * world.w + herd.x
+        if "replica" in herd.names:
+            cell = cell + herd.replica * (world.h * world.w)
+        state[..., layer] = np.bincount(cell, minlength=state[..., layer].size).reshape(state.shape[:-1])
+
+
+def age_herds(world):
+    """
+    Decreases age (and hunger for foxes) and removes the agents reaching 0
+    """
+    b, f = world.bunnies, world.foxes
+    b.age -= 1
+    b.keep(b.age != 0)
+    f.age -= 1
+    f.hunger -= 1
+    np.minimum(f.hunger, f.maxHunger, out=f.hunger)  # hunger can't go over maxHunger
+    f.keep((f.age != 0) & (f.hunger != 0))
+
+
+def replica_of(herd, idx):
+    """
+    :return: world of the agents idx of herd when it holds several worlds (see replicas.py), None if it holds one
+    :rtype: Array
+    """
+    return herd.replica[idx] if "replica" in herd.names else None
+
+
+def draw(rng, herd, idx):
+    """
+    :return: one uniform per agent idx of herd, drawn from the random stream of its world if herd holds several
+    :rtype: Array
+    """
+    g = replica_of(herd, idx)
+    return rng.random(len(idx) if g is None else g)
+
+
+def due(t, herd):
+    """
+    :return: indices of the agents of herd acting on step t, agents marked as ghosts (see sharded.py) never act
+    :rtype: Array
+    """
+    acting = t % herd.speed == 0
+    if "ghost" in herd.names:
+        acting &= herd.ghost == 0
+    return np.flatnonzero(acting)
+
+
+def bunnies_act(t, world, age_bunny):
+    """
+    Batched Bunny.act: flee the closest fox, else maybe want to reproduce and move randomly, else find a partner
+    """
+    b, f, rng = world.bunnies, world.foxes, world.rng
+    active = due(t, b)
+    if not len(active):
+        return
+    fox, _ = nearest(b.x[active], b.y[active], b.visibility[active], f.x, f.y, world.w, world.h, world.cellSize,
+                     qg=replica_of(b, active), tg=replica_of(f, slice(None)))
+    flee = fox >= 0
+    idle = ~flee & (b.gestStatus[active] == 0)
+    seek = active[~flee & ~idle]
+
+    i = active[flee]  # if there is a fox, run away
+    b.x[i], b.y[i] = move_towards(b.x[i], b.y[i], f.x[fox[flee]], f.y[fox[flee]], -1, world.w, world.h, rng,
+                                  replica_of(b, i))
+
+    i = active[idle]  # random chance to want to reproduce next turn, move randomly
+    b.gestStatus[i] = draw(rng, b, i) < b.gestChance[i]
+    b.x[i], b.y[i] = random_movement(b.x[i], b.y[i], world.w, world.h, rng, replica_of(b, i))
+
+    # if the agent wants to reproduce, find another bunny
+    mate, _ = nearest(b.x[seek], b.y[seek], b.visibility[seek], b.x, b.y, world.w, world.h, world.cellSize, exclude=seek,
+                      qg=replica_of(b, seek), tg=replica_of(b, slice(None)))
+    found = mate >= 0
+    i, mate = seek[found], mate[found]
+    mateX, mateY = b.x[mate], b.y[mate]
+    b.x[i], b.y[i] = move_towards(b.x[i], b.y[i], mateX, mateY, 1, world.w, world.h, rng, replica_of(b, i))
+    parents = i[(b.x[i] == mateX) & (b.y[i] == mateY)]  # if a bunny has been found, reproduce
+    b.gestStatus[parents] = 0
+    i = seek[~found]
+    b.x[i], b.y[i] = random_movement(b.x[i], b.y[i], world.w, world.h, rng, replica_of(b, i))
+    # the newborns are copies of the parents with a reset age
+    b.extend(parents, b.gestNumber[parents], age=age_bunny)
+
+
+def foxes_act(t, world, age_fox):
+    """
+    Batched Fox.act: foxes not hunting look for a partner when they want to reproduce, hunting foxes chase the
+    closest bunny and eat it when they reach it
+    """
+    b, f, rng = world.bunnies, world.foxes, world.rng
+    active = due(t, f)
+    if not len(active):
+        return
+    calm = active[f.huntStatus[active] == 0]
+    hunting = active[f.huntStatus[active] != 0]
+
+    # if hunger goes under thresholdMin, go hunting
+    f.huntStatus[calm[f.hunger[calm] <= f.hungerThresMin[calm]]] = 1
+    wants = calm[f.gestStatus[calm] == 1]
+    others = calm[f.gestStatus[calm] != 1]
+    f.gestStatus[others[f.gestChance[others] > draw(rng, f, others)]] = 1  # random chance to want to reproduce
+    mate, _ = nearest(f.x[wants], f.y[wants], f.visibility[wants], f.x, f.y, world.w, world.h, world.cellSize,
+                      exclude=wants, qg=replica_of(f, wants), tg=replica_of(f, slice(None)))
+    found = mate >= 0
+    i, mate = wants[found], mate[found]
+    mateX, mateY = f.x[mate], f.y[mate]
+    f.x[i], f.y[i] = move_towards(f.x[i], f.y[i], mateX, mateY, 1, world.w, world.h, rng, replica_of(f, i))
+    parents = i[(f.x[i] == mateX) & (f.y[i] == mateY)]  # if another fox is found, reproduce
+    f.gestStatus[parents] = 0
+
+    # if hunger goes over thresholdMax, stop hunting
+    f.huntStatus[hunting[f.hunger[hunting] >= f.hungerThresMax[hunting]]] = 0
+    prey, _ = nearest(f.x[hunting], f.y[hunting], f.visibility[hunting], b.x, b.y, world.w, world.h, world.cellSize,
+                      qg=replica_of(f, hunting), tg=replica_of(b, slice(None)))
+    found = prey >= 0
+    i, prey = hunting[found], prey[found]
+    preyX, preyY = b.x[prey], b.y[prey]
+    f.x[i], f.y[i] = move_towards(f.x[i], f.y[i], preyX, preyY, 1, world.w, world.h, rng, replica_of(f, i))
+    caught = (f.x[i] == preyX) & (f.y[i] == preyY)
+    # a bunny reached by several foxes is eaten by the first one
+    eaten, first = np.unique(prey[caught], return_index=True)
+    hunters = i[caught][first]
+    f.hunger[hunters] += f.hungerReward[hunters]
+    alive = np.ones(len(b), dtype=bool)
+    alive[eaten] = False
+    b.keep(alive)
+
+    # the newborns are copies of the parents with a reset age
+    f.extend(parents, f.gestNumber[parents], age=age_fox)
+
+
+def step(t, state, world, age_bunny, age_fox):
+    """
+    Advances every agent of world by one step
+    :param t: time
+    :type t: Int
+    :param state: state, integer array of size h*w*2 with the number of bunnies and foxes on each spot
+    :type state: Array
+    :param world: the herds of the world
+    :type world: VectorWorld
+    :param age_bunny, age_fox: age of the newborns
+    :type age_bunny, age_fox: Int
+    :return: state
+    :rtype: Array
+    """
+    age_herds(world)
+    bunnies_act(t, world, age_bunny)
+    foxes_act(t, world, age_fox)
+    count_cells(state, world)
+    return state
+
+
+def export(world):
+    """
+    Exports the coordinates of the agents in arrays readable by matplotlib
+    :return: XBunnies, YBunnies, XFoxes, YFoxes
+    :rtype: Array
+    """
+    return world.bunnies.x, world.bunnies.y, world.foxes.x, world.foxes.y
+
+
+def count(world):
+    """
+    counts living bunnies and foxes and the average bunny speed (for natural selection)
+    :return: liveBunnies, liveFoxes, avgSpeed
+    :rtype: Int or Float
+    """
+    liveBunnies = len(world.bunnies)
+    return liveBunnies, len(world.foxes), float(world.bunnies.speed.sum())/max(liveBunnies, 0.1)
@@ -0,0 +1,130 @@
+"""
+Python-Ecosystem by Alexandre Sajus
+
+More information at:
+https://github.com/AlexandreSajus/PythonEcosystem
+
+viewer.py watches a simulation without slowing it down: the simulation runs at full speed in a worker process and
+publishes a snapshot every few steps, the matplotlib viewer only draws the latest snapshot it received
+    python -m ecosystem view --every 10
+"""
+
+import multiprocessing
+import queue
+
+import numpy as np
+
+import run
+from counters import RingBuffer, TimeSeries
+
+SERIES = ("T", "popBunny", "popFox", "speed")
+
+
+def snapshot(t, liveAgents, pending):
+    """
+    :return: positions of the agents as (n, 2) arrays and the time series since the last published snapshot
+    :rtype: Dict
+    """
+    (XBunnies, YBunnies, XFoxes, YFoxes) = run.export(liveAgents)
+    return {
+        "t": t,
+        "bunnies": np.column_stack((XBunnies, YBunnies)),
+        "foxes": np.column_stack((XFoxes, YFoxes)),
+        "series": {name: pending[name].copy() for name in SERIES},
+    }
+
+
+def simulation_worker(snapshots, stop, params=None, engine=None, seed=None, every=10, steps=None):
+    """
+    Simulates a new world until stop is set or steps is reached, putting a snapshot in snapshots every few steps
+    The worker never waits for the viewer: when snapshots is full the snapshot is dropped, its time series being sent
+    with the next one. None is put at the end of the simulation
+    :param snapshots: queue read by the viewer
+    :type snapshots: multiprocessing.Queue
+    :param stop: event set by the viewer when it is closed
+    :type stop: multiprocessing.Event
+    :param every: steps between two snapshots
+    :type every: Int
+    :param steps: number of steps, None to simulate until stop is set
+    :type steps: Int
+    """
+    params = params or run.parameters()
+    state, liveAgents = run.new_world(params, engine, seed)
+    pending = TimeSeries(SERIES, capacity=every)
+    t = 0
+    while not stop.is_set() and (steps is None or t < steps):
+        state = run.step(t, state, liveAgents, params["age_fox"])
+        t += 1
+        pending.append(t, *run.count(liveAgents))
+        # the viewer is behind when snapshots is full: skip this frame without exporting the agents
+        if t % every == 0 and not snapshots.full():
+            try:
+                snapshots.put_nowait(snapshot(t, liveAgents, pending))
+                pending.clear()
+            except queue.Full:
+                pass  # filled since full was checked
+    if not stop.is_set():
+        snapshots.put(snapshot(t, liveAgents, pending))
+        snapshots.put(None)
+
+
+def latest_snapshot(snapshots, series):
+    """
+    Empties snapshots, appending the time series of every snapshot to series
+    :return: the latest snapshot, None if there was none, and True if the simulation is over
+    :rtype: Dict, Bool
+    """
+    latest = None
+    while True:
+        try:
+            received = snapshots.get_nowait()
+        except queue.Empty:
+            return latest, False
+        if received is None:
+            return latest, True
+        series.extend(*(received["series"][name] for name in SERIES))
+        latest = received
+
+
+def main(every=10, steps=None, params=None, engine=None, seed=None, interval=30):
+    """
+    Runs a simulation in a worker process and animates its latest snapshots with matplotlib
+    :param every: steps between two snapshots
+    :type every: Int
+    :param steps: number of steps, None to simulate until the window is closed
+    :type steps: Int
+    :param interval: delay between frames in milliseconds
+    :type interval: Int
+    """
+    import matplotlib.animation as animation
+    import matplotlib.pyplot as plt
+
+    snapshots = multiprocessing.Queue(maxsize=2)
+    stop = multiprocessing.Event()
+    worker = multiprocessing.Process(target=simulation_worker, args=(snapshots, stop, params, engine, seed, every, steps),
+                                     daemon=True)
+    worker.start()
+
+    fig, bunnies, foxes, popBunnyData, popFoxData, speedData = run.make_figure(plt)
+    # the last 5000 values of time, live bunnies, live foxes and average bunny speed
+    series = RingBuffer(SERIES, capacity=5000)
+
+    def animate(_):
+        latest, _ = latest_snapshot(snapshots, series)
+        if latest is not None:
+            bunnies.set_offsets(latest["bunnies"])
+            foxes.set_offsets(latest["foxes"])
+            popBunnyData.set_data(series["T"], series["popBunny"])
+            popFoxData.set_data(series["T"], series["popFox"])
+            speedData.set_data(series["T"], series["speed"])
+        return bunnies, foxes, popBunnyData, popFoxData, speedData,
+
+    ani = animation.FuncAnimation(fig, animate, interval=interval, blit=True, cache_frame_data=False)
+    fig.canvas.mpl_connect("close_event", lambda event: stop.set())
+    plt.show()
+
+    stop.set()
+    worker.join(timeout=1)
+    if worker.is_alive():
+        worker.terminate()
+    return ani